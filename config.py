@@ -11,11 +11,48 @@ BANNED_WORDS = [
     "nigger", "faggot", "retard", "kike", "chink", "spic",
     "rape", "porn", "sex", "cock", "cum", "slut", "whore", "kys", "nigga"
 ]
+PROFANITY = [
+    "fuck", "shit", "bitch", "cunt", "whore", "slut",
+    "nigger", "faggot", "cock", "dick", "pussy", "cum",
+]
+BAD_NICK_FRAGMENTS = ["nigg", "fag", "cum", "sex"]
 STAFF_ROLES_FOR_PING = [1439247653517918289]
 IMMUNITY_ROLES = [1429915253596094474, 1429914934145319064, 1429914390433501286, 1429917902341017731, 1429449866588717167, 1425274144882298890, 1425274034219651162]
-recent_messages = {}
-recent_message_timestamps = {}
-recent_joins = []
+SPAM_WINDOW_SIZE = 6
+SPAM_MAX_USERS = 20000
+SPAM_IDLE_TTL = 30 * 60
+FLOOD_WINDOW = 30
+FLOOD_USER_THRESHOLD = 3
+FLOOD_CHANNEL_THRESHOLD = 5
+FLOOD_GLOBAL_THRESHOLD = 8
+FLOOD_MIN_LENGTH = 24
+FLOOD_MAX_EVENTS = 50000
+DOMAIN_FLOOD_WINDOW = 60
+DOMAIN_FLOOD_THRESHOLD = 6
+DOMAIN_FLOOD_MAX_EVENTS = 20000
+DEFAULT_ALLOWED_DOMAINS = [
+    "discord.com", "discordapp.com", "discordapp.net", "tenor.com", "giphy.com",
+    "youtube.com", "youtu.be", "twitch.tv", "github.com",
+]
+RAID_WINDOWS = ((10, 5), (60, 8), (10 * 60, 30))
+RAID_RELEASE_RATIO = 0.5
+RAID_QUIET_PERIOD = 2 * 60
+RAID_SLOWMODE_SECONDS = 0
+AI_MAX_CONCURRENCY = 4
+AI_MAX_QUEUE = 20
+AI_CACHE_SIZE = 1000
+AI_CACHE_TTL = 6 * 60 * 60
+AI_CACHE_PERSIST = True
+AI_REQUEST_DEADLINE = 20
+AI_MAX_RETRIES = 2
+AI_RETRY_BASE_DELAY = 0.5
+AI_RETRY_BUDGET_RATIO = 0.1
+AI_HEDGE_ENABLED = True
+AI_HEDGE_MIN_SAMPLES = 20
+WELCOME_BURST_RATE = 5
+WELCOME_BURST_WINDOW = 30
+WELCOME_FLUSH_INTERVAL = 10
+WELCOME_NAMES_SHOWN = 15
 recent_message_history = {}
 AI_PROHIBITED_PATTERNS = [
     r"\bwhat\s+does\s+.*\b(n[-\s]*word|slur)\b.*\bmean\b",
@@ -31,13 +68,40 @@ AI_PROHIBITED_PATTERNS = [
     r"\bblyat\b", r"\bsuka\b", r"\bnaxuy\b",
     r"\bблять\b", r"\bсука\b", r"\bнахуй\b", r"\bхуй\b",
 ]
+CONFIG_SCHEMA = {
+    "motd_channel_id": (int, str, type(None)),
+    "motd_list": list,
+    "welcome_channel_id": (int, str, type(None)),
+    "welcome_burst_rate": int,
+    "banned_words": list,
+    "allowed_domains": list,
+    "blocked_domains": list,
+    "uptime_targets": list,
+    "ai_enabled": bool,
+}
 CHANNEL_THEMES = {
     1424038714266357886: "Gaming, General Chat, Anime and Fun",
 }
-
-def is_ai_prompt_disallowed(text: str) -> bool:
-    lowered = text.lower()
-    for pat in AI_PROHIBITED_PATTERNS:
-        if re.search(pat, lowered):
-            return True
-    return False
+MODERATION_PROFILES = {
+    "default": {
+        "max_lines": 10,
+        "max_chars": 500,
+        "max_staff_pings": 4,
+        "max_links": 2,
+        "rules": None,
+        "extra_words": [],
+    },
+    "media": {
+        "max_lines": 20,
+        "max_links": 10,
+    },
+}
+# Channel or category ID -> profile name. Anything not listed here falls back to
+# the first THEME_PROFILES keyword found in its CHANNEL_THEMES entry.
+CHANNEL_PROFILES = {}
+THEME_PROFILES = {
+    "media": "media",
+    "art": "media",
+    "memes": "media",
+    "clips": "media",
+}
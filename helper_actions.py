@@ -0,0 +1,83 @@
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger("tars")
+
+# Deletes have no priority: run_now() sends them straight past the queue.
+PRIORITY_TIMEOUT = 0
+PRIORITY_NOTICE = 1
+PRIORITY_DM = 2
+PRIORITY_LOG = 3
+ACTION_WORKERS = 4
+ACTION_MAX_PENDING = 500
+ACTION_CLOSE_TIMEOUT = 10
+
+
+class ActionDispatcher:
+    def __init__(self, workers: int = ACTION_WORKERS, max_pending: int = ACTION_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        self._urgent: set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.create_task(self._run()))
+
+    # Deletes skip the queue entirely so a backlog of notifications can never hold
+    # offending content up; everything else shares the bounded worker pool.
+    def run_now(self, name: str, factory):
+        task = asyncio.create_task(self._execute(name, factory))
+        self._urgent.add(task)
+        task.add_done_callback(self._urgent.discard)
+
+    def submit(self, priority: int, name: str, factory) -> bool:
+        if priority > PRIORITY_TIMEOUT and self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            logger.warning(f"Dropping moderation action {name}: {self._queue.qsize()} actions pending.")
+            return False
+        self.start()
+        self._queue.put_nowait((priority, next(self._seq), name, factory))
+        return True
+
+    async def _execute(self, name: str, factory):
+        try:
+            await factory()
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Moderation action {name} failed: {e}")
+
+    async def _run(self):
+        while True:
+            _, _, name, factory = await self._queue.get()
+            try:
+                # discord.py sleeps through 429s inside the call, so a rate-limited
+                # route simply occupies its worker and the queue absorbs the backlog.
+                await self._execute(name, factory)
+            finally:
+                self._queue.task_done()
+
+    async def close(self):
+        if self._urgent:
+            await asyncio.gather(*self._urgent, return_exceptions=True)
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), ACTION_CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"Action dispatcher closed with {self.pending} actions still queued.")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,374 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+
+import discord
+import openai
+from openai import AsyncOpenAI
+
+from config import AI_CACHE_SIZE, AI_CACHE_TTL, AI_CACHE_PERSIST, AI_MAX_CONCURRENCY, AI_MAX_QUEUE, \
+    AI_REQUEST_DEADLINE, AI_MAX_RETRIES, AI_RETRY_BASE_DELAY, AI_RETRY_BUDGET_RATIO, AI_HEDGE_ENABLED, \
+    AI_HEDGE_MIN_SAMPLES
+from helper_breakers import CircuitBreaker
+from helper_db import Database, database
+from tars import tars_text
+
+logger = logging.getLogger("tars")
+AI_MODEL = "gpt-4o-mini"
+AI_STREAM_EDIT_INTERVAL = 1.0
+_FRAME_SLOT = "\x00"
+AI_PRIORITY_STAFF = 0
+AI_PRIORITY_MEMBER = 1
+AI_PRIORITY_8BALL = 2
+AI_LATENCY_SAMPLES = 500
+AI_RETRY_BUDGET_CAP = 10
+# Connection drops, 429s and 5xx are worth another try; bad requests and auth errors are not.
+AI_RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class ReplyStream:
+    def __init__(self, message: discord.Message, screen, interval: float = AI_STREAM_EDIT_INTERVAL):
+        self.message = message
+        # screen(text) -> (content, blocked); blocked content replaces the reply outright.
+        self.screen = screen
+        self.interval = interval
+        # tars_text picks a random framing; pick it once so edits don't flicker.
+        self.frame = tars_text(_FRAME_SLOT)
+        self.reply: discord.Message | None = None
+        self.parts: list[str] = []
+        self.shown = ""
+        self.blocked = False
+        self.edits = 0
+        self._last_edit = 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    async def feed(self, chunk: str):
+        if self.blocked or not chunk:
+            return
+        self.parts.append(chunk)
+        if self.reply is not None and time.monotonic() - self._last_edit < self.interval:
+            return
+        text = self.text
+        # Only complete words are shown, so a URL or word split across chunks is
+        # screened whole rather than slipping out half-formed.
+        cut = max(text.rfind(" "), text.rfind("\n"))
+        if cut > 0:
+            await self._show(text[:cut].rstrip())
+
+    async def finish(self) -> str:
+        if not self.blocked:
+            await self._show(self.text.strip())
+        return self.text
+
+    async def _show(self, text: str):
+        content, blocked = self.screen(text)
+        if blocked:
+            self.blocked = True
+            rendered = tars_text(content)
+        elif not content or content == self.shown:
+            return
+        else:
+            rendered = self.frame.replace(_FRAME_SLOT, content)
+        if self.reply is None:
+            self.reply = await self.message.reply(rendered)
+        else:
+            await self.reply.edit(content=rendered)
+            self.edits += 1
+        self.shown = content
+        self._last_edit = time.monotonic()
+
+
+async def stream_completion(client: AsyncOpenAI, messages: list, sink: ReplyStream, max_tokens: int,
+                            temperature: float) -> int:
+    stream = await client.chat.completions.create(
+        model=AI_MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    tokens = 0
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                tokens = chunk.usage.total_tokens
+            if chunk.choices:
+                await sink.feed(chunk.choices[0].delta.content or "")
+            if sink.blocked:
+                # The reply has already been replaced; stop paying for the rest.
+                break
+    finally:
+        await stream.close()
+    return tokens
+
+
+def prompt_key(prompt: str, persona: str, context: list[str] | None = None) -> str:
+    normalized = " ".join(prompt.casefold().split())
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (persona, normalized, *(context or ())):
+        digest.update(part.encode())
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = AI_CACHE_SIZE, ttl: float = AI_CACHE_TTL, db: Database | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db = db
+        # Wall-clock expiry rather than monotonic, so persisted entries stay valid across restarts.
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, key: str, expires: float, response: str):
+        self._entries[key] = (expires, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def put(self, key: str, response: str):
+        if not response:
+            return
+        expires = time.time() + self.ttl
+        self._store(key, expires, response)
+        if self.db is not None:
+            await self.db.audit.add("ai_cache", (key, response, expires))
+
+    async def load(self):
+        if self.db is None:
+            return
+        rows = await self.db.get_ai_cache(time.time(), self.max_size)
+        # Oldest first, so the freshest entries end up most recently used.
+        for key, response, expires in reversed(rows):
+            self._store(key, expires, response)
+
+
+class AIOverloaded(Exception):
+    pass
+
+
+class AIScheduler:
+    def __init__(self, concurrency: int = AI_MAX_CONCURRENCY, max_queue: int = AI_MAX_QUEUE):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.shed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._run()))
+
+    async def submit(self, key: str, priority: int, factory):
+        future = self._inflight.get(key)
+        if future is not None:
+            # Someone already asked this exact question; share their answer.
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        if priority > AI_PRIORITY_STAFF and self._queue.qsize() >= self.max_queue:
+            self.shed += 1
+            raise AIOverloaded(f"{self._queue.qsize()} AI requests already queued")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Callers that give up early must not leave an unretrieved exception behind.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self._queue.put_nowait((priority, next(self._seq), key, factory, future))
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            _, _, key, factory, future = await self._queue.get()
+            self.active += 1
+            try:
+                future.set_result(await factory())
+                self.completed += 1
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+            finally:
+                self.active -= 1
+                self._inflight.pop(key, None)
+                self._queue.task_done()
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            future.cancel()
+        self._inflight.clear()
+
+
+class LatencyTracker:
+    def __init__(self, size: int = AI_LATENCY_SAMPLES):
+        self._samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = AI_RETRY_BUDGET_RATIO, cap: float = AI_RETRY_BUDGET_CAP):
+        # Every request earns `ratio` of a retry, so retries and hedges together can
+        # add at most that fraction of extra load when the provider is struggling.
+        self.ratio = ratio
+        self.cap = cap
+        self.tokens = cap
+
+    def deposit(self):
+        self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AIDeadlineExceeded(Exception):
+    pass
+
+
+class ResilientCaller:
+    def __init__(self, deadline: float = AI_REQUEST_DEADLINE, max_retries: int = AI_MAX_RETRIES,
+                 base_delay: float = AI_RETRY_BASE_DELAY, hedge: bool = AI_HEDGE_ENABLED,
+                 hedge_min_samples: int = AI_HEDGE_MIN_SAMPLES):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.budget = RetryBudget()
+        # Streams run for the whole generation plus throttled Discord edits, so they
+        # get their own samples and never set the hedge threshold.
+        self.latency = LatencyTracker()
+        self.stream_latency = LatencyTracker()
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    async def call(self, factory, streamed: bool = False):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            started = loop.time()
+            try:
+                attempt_call = factory() if streamed or not self.hedge else self._hedged(factory)
+                result = await asyncio.wait_for(attempt_call, max(deadline - started, 0))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise AIDeadlineExceeded(f"no response within {self.deadline}s") from None
+            except AI_RETRYABLE_ERRORS as e:
+                # Full jitter keeps a burst of failed requests from retrying in lockstep.
+                delay = random.uniform(0, self.base_delay * 2 ** attempt)
+                if attempt >= self.max_retries or loop.time() + delay >= deadline:
+                    raise
+                if not self.budget.withdraw():
+                    self.budget_exhausted += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"Retrying OpenAI request ({attempt}/{self.max_retries}) after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            (self.stream_latency if streamed else self.latency).record(loop.time() - started)
+            return result
+
+    async def _hedged(self, factory):
+        first = asyncio.create_task(factory())
+        tasks = [first]
+        try:
+            delay = self.latency.percentile(0.95) if len(self.latency) >= self.hedge_min_samples else None
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.budget.withdraw():
+                return await first
+            # The first request is slower than 95% of recent ones; race a second copy.
+            self.hedges += 1
+            tasks.append(asyncio.create_task(factory()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+    def report(self, streamed: bool = False) -> dict[str, float | None]:
+        tracker = self.stream_latency if streamed else self.latency
+        return {f"p{round(q * 100)}": tracker.percentile(q) for q in (0.5, 0.95, 0.99)}
+
+
+ai_scheduler = AIScheduler()
+# Bad requests and auth errors are our bug, not an outage; they never open the breaker.
+openai_breaker = CircuitBreaker("OpenAI", failure_types=(*AI_RETRYABLE_ERRORS, AIDeadlineExceeded))
+ai_caller = ResilientCaller()
+response_cache = ResponseCache(db=database if AI_CACHE_PERSIST else None)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+import aiohttp
+import discord
+
+logger = logging.getLogger("tars")
+BREAKER_WINDOW = 60
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+# Targets are probed every few minutes, so their breakers look at a longer window.
+UPTIME_BREAKER_THRESHOLD = 3
+UPTIME_BREAKER_WINDOW = 30 * 60
+UPTIME_BREAKER_COOLDOWN = 15 * 60
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"{name} circuit is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, window: int = BREAKER_WINDOW,
+                 cooldown: float = BREAKER_COOLDOWN, failure_types: tuple = (Exception,)):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        # Errors outside failure_types mean the dependency answered, just not the way we hoped.
+        self.failure_types = failure_types
+        # Failures per second in a fixed ring indexed by second % window; slots are
+        # cleared as time moves past them, so recording is O(1) amortised.
+        self._slots = [0] * window
+        self._head = int(time.monotonic())
+        self.recent = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probe_started: float | None = None
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self.last_failure: float | None = None
+
+    def _advance(self, second: int):
+        if second <= self._head:
+            return
+        for s in range(self._head + 1, self._head + 1 + min(second - self._head, self.window)):
+            index = s % self.window
+            self.recent -= self._slots[index]
+            self._slots[index] = 0
+        self._head = second
+
+    def _probe_free(self, now: float) -> bool:
+        # A probe that never reported back (cancelled, say) stops blocking after a cooldown.
+        return self._probe_started is None or now - self._probe_started >= self.cooldown
+
+    @property
+    def available(self) -> bool:
+        now = time.monotonic()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        return self._probe_free(now)
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_started = None
+            logger.info(f"Circuit breaker {self.name} half-open; sending a trial request.")
+        if not self._probe_free(now):
+            self.rejected += 1
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self):
+        if self.state == CLOSED:
+            return
+        self.state = CLOSED
+        self._slots = [0] * self.window
+        self.recent = 0
+        self._probe_started = None
+        logger.info(f"Circuit breaker {self.name} closed.")
+
+    def record_failure(self, error: Exception | None = None):
+        if error is not None and not isinstance(error, self.failure_types):
+            self.record_success()
+            return
+        now = time.monotonic()
+        self.failures += 1
+        self.last_failure = time.time()
+        if self.state == HALF_OPEN:
+            self._trip(now)
+            return
+        second = int(now)
+        self._advance(second)
+        self._slots[second % self.window] += 1
+        self.recent += 1
+        if self.state == CLOSED and self.recent >= self.threshold:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self._probe_started = None
+        self.trips += 1
+        logger.error(f"Circuit breaker {self.name} opened; retrying in {self.cooldown}s.")
+
+    def failures_in_window(self) -> int:
+        self._advance(int(time.monotonic()))
+        return self.recent
+
+    async def call(self, factory):
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = await factory()
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+
+sqlite_breaker = CircuitBreaker("SQLite", failure_types=(sqlite3.Error,))
+# 4xx responses (closed DMs, missing permissions) are the recipient's problem, not Discord's.
+discord_breaker = CircuitBreaker(
+    "Discord HTTP", failure_types=(discord.DiscordServerError, aiohttp.ClientError, asyncio.TimeoutError)
+)
+# One breaker per uptime target, so a site that is down for good only silences itself.
+uptime_breakers: dict[str, CircuitBreaker] = {}
+# The OpenAI breaker lives in helper_ai, next to the errors it counts.
+BREAKERS = (sqlite_breaker, discord_breaker)
+
+
+def uptime_breaker(url: str) -> CircuitBreaker:
+    breaker = uptime_breakers.get(url)
+    if breaker is None:
+        breaker = uptime_breakers[url] = CircuitBreaker(
+            f"Uptime {url}", threshold=UPTIME_BREAKER_THRESHOLD, window=UPTIME_BREAKER_WINDOW,
+            cooldown=UPTIME_BREAKER_COOLDOWN
+        )
+    return breaker
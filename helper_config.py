@@ -0,0 +1,61 @@
+import json
+import logging
+
+from config import CONFIG_SCHEMA
+from helper_db import Database, database
+
+logger = logging.getLogger("tars")
+
+
+class ConfigStore:
+    def __init__(self, schema: dict, db: Database = database):
+        self.schema = schema
+        self.db = db
+        self._values: dict = {}
+        self._listeners: dict[str, list] = {}
+        self.loaded = False
+
+    def validate(self, key: str, value):
+        if key not in self.schema:
+            raise KeyError(f"Unknown config key: {key}")
+        expected = self.schema[key]
+        types = expected if isinstance(expected, tuple) else (expected,)
+        # bool is an int subclass; keep it out of integer-only keys.
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise TypeError(f"Config key {key} does not accept {value!r}")
+
+    async def load(self):
+        values = {}
+        for key, raw in await self.db.all_config():
+            try:
+                value = json.loads(raw)
+                self.validate(key, value)
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring stored config {key}: {e}")
+                continue
+            values[key] = value
+        self._values = values
+        self.loaded = True
+        for key, callbacks in self._listeners.items():
+            if key in values:
+                for callback in callbacks:
+                    callback(values[key])
+
+    def get(self, key: str, default=None):
+        return self._values.get(key, default)
+
+    def items(self) -> list[tuple[str, object]]:
+        return sorted(self._values.items())
+
+    def subscribe(self, key: str, callback):
+        self._listeners.setdefault(key, []).append(callback)
+
+    async def set(self, key: str, value):
+        self.validate(key, value)
+        await self.db.set_config(key, value)
+        self._values[key] = value
+        for callback in self._listeners.get(key, []):
+            callback(value)
+
+
+config_store = ConfigStore(CONFIG_SCHEMA)
@@ -0,0 +1,399 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import aiosqlite
+from config import DB_FILE
+from helper_breakers import CircuitBreaker, CircuitOpenError, sqlite_breaker
+
+logger = logging.getLogger("tars")
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_MS = 500
+AUDIT_QUEUE_SIZE = 5000
+AUDIT_CLOSE_TIMEOUT = 10
+AUDIT_RETRY_BASE = 0.5
+AUDIT_RETRY_MAX = 30
+AUDIT_STATEMENTS = {
+    "warns_log": "INSERT INTO warns_log(user_id, reason, time, time_epoch, moderator) VALUES(?,?,?,?,?)",
+    "boost_log": "INSERT INTO boost_log (user_id, action, points, time, time_epoch) VALUES (?, ?, ?, ?, ?)",
+    "ai_cache": "INSERT OR REPLACE INTO ai_cache(key, response, expires_epoch) VALUES (?, ?, ?)",
+}
+
+
+def utc_now_stamps() -> tuple[str, int]:
+    now = datetime.now(timezone.utc)
+    return now.isoformat(), int(now.timestamp())
+
+
+def iso_to_epoch(value: str | None) -> int | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+async def _add_lookup_indexes(conn: aiosqlite.Connection):
+    # Keep the newest mapping per key, matching what the in-memory index already served.
+    await conn.execute(
+        "DELETE FROM reaction_roles WHERE rowid NOT IN "
+        "(SELECT MAX(rowid) FROM reaction_roles GROUP BY guild_id, message_id, emoji)"
+    )
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_reaction_roles_key "
+        "ON reaction_roles(guild_id, message_id, emoji)"
+    )
+
+
+async def _add_epoch_columns(conn: aiosqlite.Connection):
+    for table, source, target in (
+        ("warns_log", "time", "time_epoch"),
+        ("boost_log", "time", "time_epoch"),
+        ("quotes", "time", "time_epoch"),
+        ("reminders", "remind_at", "remind_at_epoch"),
+    ):
+        await conn.execute(f"ALTER TABLE {table} ADD COLUMN {target} INTEGER")
+        async with conn.execute(f"SELECT id, {source} FROM {table}") as cur:
+            rows = await cur.fetchall()
+        await conn.executemany(
+            f"UPDATE {table} SET {target} = ? WHERE id = ?",
+            [(iso_to_epoch(value), row_id) for row_id, value in rows]
+        )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_warns_log_user_time ON warns_log(user_id, time_epoch)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_boost_log_user_time ON boost_log(user_id, time_epoch)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_quotes_guild_time ON quotes(guild_id, time_epoch)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON reminders(remind_at_epoch)")
+
+
+async def _add_ai_cache(conn: aiosqlite.Connection):
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_epoch REAL NOT NULL)"
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_expires ON ai_cache(expires_epoch)")
+
+
+
+async def _drop_prefix_indexes(conn: aiosqlite.Connection):
+    # Earlier builds of migration 1 created these; the composite indexes from
+    # migration 2 start with the same column, so they only slowed inserts down.
+    for index in ("idx_warns_log_user", "idx_boost_log_user", "idx_quotes_guild"):
+        await conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+MIGRATIONS = [
+    (1, _add_lookup_indexes),
+    (2, _add_epoch_columns),
+    (3, _add_ai_cache),
+    (4, _drop_prefix_indexes),
+]
+
+
+class AuditWriter:
+    def __init__(self, db: "Database", batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_ms: int = AUDIT_FLUSH_MS, max_queue: int = AUDIT_QUEUE_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        # Bounded so a raid slows producers down instead of growing memory without limit.
+        self._queue: asyncio.Queue[tuple[str, tuple]] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def add(self, table: str, row: tuple):
+        if table not in AUDIT_STATEMENTS:
+            raise ValueError(f"Unknown audit table: {table}")
+        self.start()
+        await self._queue.put((table, row))
+
+    async def add_warn_log(self, user_id: str, reason: str, moderator: str):
+        iso, epoch = utc_now_stamps()
+        await self.add("warns_log", (user_id, reason, iso, epoch, moderator))
+
+    async def add_boost_log(self, user_id: int, action: str, points: int):
+        iso, epoch = utc_now_stamps()
+        await self.add("boost_log", (str(user_id), action, points, iso, epoch))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        failures = 0
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            written = await self._write(batch)
+            if not written:
+                self._requeue(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if written:
+                failures = 0
+            else:
+                # Back off so a locked database (or an open breaker) isn't hammered, but
+                # keep the rows: a raid is exactly when the audit trail matters.
+                await asyncio.sleep(min(AUDIT_RETRY_BASE * 2 ** failures, AUDIT_RETRY_MAX))
+                failures += 1
+
+    def _requeue(self, batch: list[tuple[str, tuple]]):
+        dropped = 0
+        for item in batch:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.error(f"Audit queue full; dropped {dropped} rows that failed to write.")
+
+    async def _write(self, batch: list[tuple[str, tuple]]) -> bool:
+        grouped: dict[str, list[tuple]] = defaultdict(list)
+        for table, row in batch:
+            grouped[table].append(row)
+        try:
+            async with self.db.transaction() as conn:
+                for table, rows in grouped.items():
+                    await conn.executemany(AUDIT_STATEMENTS[table], rows)
+            self.written += len(batch)
+            return True
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit rows, will retry: {e}")
+            return False
+
+    async def close(self):
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), AUDIT_CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Audit writer closed with {self.pending} rows still queued.")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class Database:
+    def __init__(self, path: str = DB_FILE, breaker: CircuitBreaker = sqlite_breaker):
+        self.path = path
+        self.breaker = breaker
+        self._conn: aiosqlite.Connection | None = None
+        self._open_lock = asyncio.Lock()
+        # aiosqlite serialises statements on one thread, but a multi-statement
+        # transaction still has to keep other coroutines from committing halfway.
+        self._write_lock = asyncio.Lock()
+        self.audit = AuditWriter(self)
+
+    async def open(self) -> aiosqlite.Connection:
+        async with self._open_lock:
+            if self._conn is None:
+                conn = await aiosqlite.connect(self.path, cached_statements=STATEMENT_CACHE_SIZE)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+                await conn.execute("PRAGMA foreign_keys=ON")
+                self._conn = conn
+            return self._conn
+
+    async def close(self):
+        await self.audit.close()
+        async with self._open_lock:
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            return await self.open()
+        return self._conn
+
+    @asynccontextmanager
+    async def _guard(self):
+        # A locked or broken database fails fast instead of every caller sitting out the busy timeout.
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.name)
+        try:
+            yield
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._guard():
+            conn = await self._connection()
+            async with self._write_lock:
+                try:
+                    yield conn
+                except BaseException:
+                    await conn.rollback()
+                    raise
+                await conn.commit()
+
+    async def fetchone(self, sql: str, params: tuple = ()):
+        async with self._guard():
+            conn = await self._connection()
+            async with conn.execute(sql, params) as cur:
+                return await cur.fetchone()
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list:
+        async with self._guard():
+            conn = await self._connection()
+            async with conn.execute(sql, params) as cur:
+                return list(await cur.fetchall())
+
+    async def execute(self, sql: str, params: tuple = ()) -> int:
+        async with self.transaction() as conn:
+            cur = await conn.execute(sql, params)
+            return cur.lastrowid
+
+    async def schema_version(self) -> int:
+        row = await self.fetchone("SELECT MAX(version) FROM schema_version")
+        return row[0] or 0
+
+    async def migrate(self):
+        conn = await self._connection()
+        async with self._write_lock:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, applied_at INTEGER)"
+            )
+            await conn.commit()
+        current = await self.schema_version()
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            async with self.transaction() as conn:
+                # sqlite3 only opens transactions implicitly for DML, so DDL needs an explicit BEGIN.
+                await conn.execute("BEGIN")
+                await migration(conn)
+                await conn.execute(
+                    "INSERT INTO schema_version(version, applied_at) VALUES(?,?)",
+                    (version, utc_now_stamps()[1])
+                )
+            logger.info(f"Applied database migration {version}: {migration.__name__}")
+
+    async def ping(self) -> bool:
+        return await self.fetchone("SELECT 1") is not None
+
+    async def set_config(self, key: str, value):
+        await self.execute(
+            "INSERT OR REPLACE INTO config(key, value) VALUES(?,?)",
+            (key, json.dumps(value))
+        )
+
+    async def all_config(self) -> list[tuple[str, str]]:
+        return await self.fetchall("SELECT key, value FROM config")
+
+    async def get_warning_counts(self) -> dict[str, int]:
+        rows = await self.fetchall("SELECT user_id, count FROM warnings")
+        return {user_id: count for user_id, count in rows}
+
+    async def upsert_warnings(self, rows: list[tuple[str, int]]):
+        async with self.transaction() as conn:
+            await conn.executemany(
+                "INSERT OR REPLACE INTO warnings(user_id, count) VALUES(?,?)",
+                rows
+            )
+
+    async def get_boost_points(self, user_id: int) -> int:
+        row = await self.fetchone("SELECT points FROM boost_points WHERE user_id = ?", (str(user_id),))
+        return row[0] if row else 0
+
+    async def add_boost_points(self, user_id: int, amount: int, action: str = "boost_reward") -> int:
+        async with self.transaction() as conn:
+            async with conn.execute("SELECT points FROM boost_points WHERE user_id = ?", (str(user_id),)) as cur:
+                row = await cur.fetchone()
+            new_points = (row[0] if row else 0) + amount
+            await conn.execute("INSERT OR REPLACE INTO boost_points (user_id, points) VALUES (?, ?)",
+                               (str(user_id), new_points))
+        await self.audit.add_boost_log(user_id, action, amount)
+        return new_points
+
+    async def spend_boost_points(self, user_id: int, cost: int) -> bool:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "UPDATE boost_points SET points = points - ? WHERE user_id = ? AND points >= ?",
+                (cost, str(user_id), cost)
+            )
+            if cur.rowcount == 0:
+                return False
+        await self.audit.add_boost_log(user_id, "redeem", -cost)
+        return True
+
+    async def remove_boost_points(self, user_id: int, amount: int) -> int:
+        async with self.transaction() as conn:
+            async with conn.execute("SELECT points FROM boost_points WHERE user_id = ?", (str(user_id),)) as cur:
+                row = await cur.fetchone()
+            new_amount = max(0, (row[0] if row else 0) - amount)
+            await conn.execute("UPDATE boost_points SET points = ? WHERE user_id = ?", (new_amount, str(user_id)))
+        await self.audit.add_boost_log(user_id, "admin_remove", -amount)
+        return new_amount
+
+    async def get_reaction_roles(self) -> list[tuple[str, str, str, str]]:
+        return await self.fetchall("SELECT guild_id, message_id, emoji, role_id FROM reaction_roles")
+
+    async def add_reaction_role(self, guild_id: int, message_id: int | str, emoji: str, role_id: int):
+        await self.execute(
+            "INSERT OR REPLACE INTO reaction_roles(guild_id,message_id,emoji,role_id) VALUES(?,?,?,?)",
+            (str(guild_id), str(message_id), str(emoji), str(role_id))
+        )
+
+    async def add_quote(self, guild_id: int, message_id: int, author: str, content: str, saved_by: str) -> int:
+        iso, epoch = utc_now_stamps()
+        return await self.execute(
+            "INSERT INTO quotes(guild_id,message_id,author,content,saved_by,time,time_epoch) VALUES(?,?,?,?,?,?,?)",
+            (str(guild_id), str(message_id), author, content, saved_by, iso, epoch)
+        )
+
+    async def get_quote(self, quote_id: int):
+        return await self.fetchone("SELECT id,author,content,saved_by,time FROM quotes WHERE id=?", (quote_id,))
+
+    async def add_reminder(self, user_id: int, channel_id: int, remind_at: datetime, content: str) -> int:
+        return await self.execute(
+            "INSERT INTO reminders(user_id, channel_id, remind_at, remind_at_epoch, content) VALUES(?,?,?,?,?)",
+            (str(user_id), str(channel_id), remind_at.isoformat(), int(remind_at.timestamp()), content)
+        )
+
+    async def get_pending_reminders(self, after: datetime) -> list[tuple[str, str, int, str]]:
+        return await self.fetchall(
+            "SELECT user_id, channel_id, remind_at_epoch, content FROM reminders WHERE remind_at_epoch > ?",
+            (int(after.timestamp()),)
+        )
+
+    async def get_ai_cache(self, now: float, limit: int) -> list[tuple[str, str, float]]:
+        await self.execute("DELETE FROM ai_cache WHERE expires_epoch <= ?", (now,))
+        return await self.fetchall(
+            "SELECT key, response, expires_epoch FROM ai_cache ORDER BY expires_epoch DESC LIMIT ?",
+            (limit,)
+        )
+
+
+database = Database()
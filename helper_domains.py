@@ -0,0 +1,124 @@
+import re
+import time
+from collections import deque
+
+from config import DOMAIN_FLOOD_WINDOW, DOMAIN_FLOOD_THRESHOLD, DOMAIN_FLOOD_MAX_EVENTS
+
+# Hosts are limited to word characters, dots and hyphens, so wrappers such as
+# <no-embed>, [masked](links) and ||spoilers|| never end up in the hostname.
+URL_HOST_PATTERN = re.compile(r"https?://(?:[^\s/@<>()|]*@)?([\w.-]+)", re.IGNORECASE)
+DOMAIN_PATTERN = re.compile(r"^(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9-]{2,}$")
+ALLOW = "allow"
+BLOCK = "block"
+_VALUE = ""
+
+
+def _ascii_host(host: str) -> str:
+    host = host.lower().rstrip(".")
+    if host.isascii():
+        return host
+    # Internationalised names are compared in their punycode form.
+    try:
+        return host.encode("idna").decode()
+    except UnicodeError:
+        return host
+
+
+def extract_domains(text: str) -> list[str]:
+    return [_ascii_host(host) for host in URL_HOST_PATTERN.findall(text)]
+
+
+def normalize_domain(text: str) -> str | None:
+    text = text.strip().lower()
+    if "://" in text:
+        hosts = extract_domains(text)
+        text = hosts[0] if hosts else ""
+    text = text.split("/", 1)[0].rstrip(".")
+    if text.startswith("*."):
+        text = text[2:]
+    text = _ascii_host(text)
+    return text if DOMAIN_PATTERN.match(text) else None
+
+
+class DomainTrie:
+    def __init__(self):
+        # Labels are stored right to left, so a listed domain covers every
+        # subdomain and a lookup walks at most one node per label.
+        self._root: dict = {}
+        self.size = 0
+
+    def add(self, domain: str, value: str):
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if _VALUE not in node:
+            self.size += 1
+        node[_VALUE] = value
+
+    def lookup(self, domain: str) -> str | None:
+        node = self._root
+        found = None
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(_VALUE, found)
+        return found
+
+
+class DomainReputation:
+    def __init__(self, allowed: list[str], blocked: list[str]):
+        self.rebuild(allowed, blocked)
+
+    def rebuild(self, allowed: list[str], blocked: list[str]):
+        trie = DomainTrie()
+        for domain in allowed:
+            trie.add(domain, ALLOW)
+        # The most specific entry wins; an exact domain on both lists stays blocked.
+        for domain in blocked:
+            trie.add(domain, BLOCK)
+        self._trie = trie
+
+    def __len__(self) -> int:
+        return self._trie.size
+
+    def classify(self, domain: str) -> str | None:
+        return self._trie.lookup(domain)
+
+
+class DomainFloodDetector:
+    def __init__(self, window: float = DOMAIN_FLOOD_WINDOW, threshold: int = DOMAIN_FLOOD_THRESHOLD,
+                 max_events: int = DOMAIN_FLOOD_MAX_EVENTS):
+        self.window = window
+        self.threshold = threshold
+        self.max_events = max_events
+        self._events: deque[tuple[float, tuple[int, str]]] = deque()
+        self._counts: dict[tuple[int, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _expire(self, now: float):
+        events = self._events
+        counts = self._counts
+        while events and (now - events[0][0] > self.window or len(events) > self.max_events):
+            _, key = events.popleft()
+            remaining = counts[key] - 1
+            if remaining:
+                counts[key] = remaining
+            else:
+                del counts[key]
+
+    def observe(self, guild_id: int, domains: set[str]) -> tuple[str, int] | None:
+        now = time.monotonic()
+        self._expire(now)
+        flooded = None
+        for domain in domains:
+            key = (guild_id, domain)
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            self._events.append((now, key))
+            # Reported once, on the post that crosses the threshold, not on every one after.
+            if count == self.threshold and flooded is None:
+                flooded = (domain, count)
+        return flooded
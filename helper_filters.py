@@ -0,0 +1,60 @@
+import re
+
+from config import NWORD_PATTERN, SUICIDE_PATTERNS, DRUG_KEYWORDS, AI_PROHIBITED_PATTERNS, PROFANITY, \
+    BAD_NICK_FRAGMENTS
+
+
+def word_alternation(words) -> str | None:
+    cleaned = {w.strip().lower() for w in words if w and w.strip()}
+    if not cleaned:
+        return None
+    # Longest first so a short word never shadows a longer one sharing its prefix.
+    ordered = sorted(cleaned, key=len, reverse=True)
+    return r"\b(?:" + "|".join(re.escape(w) for w in ordered) + r")\b"
+
+
+class ModerationMatcher:
+    CATEGORIES = ("banned", "slur", "self_harm", "drug")
+
+    def __init__(self, banned_words):
+        self.banned_words = tuple(banned_words)
+        parts = []
+        banned = word_alternation(self.banned_words)
+        if banned:
+            parts.append(f"(?P<banned>{banned})")
+        parts.append(f"(?P<slur>{NWORD_PATTERN.pattern})")
+        self_harm = "|".join(f"(?:{p.pattern})" for p in SUICIDE_PATTERNS)
+        parts.append(f"(?P<self_harm>{self_harm})")
+        parts.append(f"(?P<drug>{word_alternation(DRUG_KEYWORDS)})")
+        self.pattern = re.compile("|".join(parts), re.IGNORECASE)
+
+    def scan(self, text: str) -> dict[str, str]:
+        hits: dict[str, str] = {}
+        if not text:
+            return hits
+        for m in self.pattern.finditer(text):
+            category = m.lastgroup
+            if category not in hits:
+                hits[category] = m.group(category).lower()
+                if len(hits) == len(self.CATEGORIES):
+                    break
+        return hits
+
+
+class TextFilter:
+    def __init__(self, banned_words):
+        self.banned_words = tuple(banned_words)
+        self.prompt_pattern = re.compile("|".join(f"(?:{p})" for p in AI_PROHIBITED_PATTERNS), re.IGNORECASE)
+        self.reply_pattern = re.compile(word_alternation([*PROFANITY, *self.banned_words]), re.IGNORECASE)
+        # Nicknames match on fragments rather than whole words, since display names
+        # routinely glue words together.
+        self.nickname_pattern = re.compile("|".join(re.escape(f) for f in BAD_NICK_FRAGMENTS), re.IGNORECASE)
+
+    def prompt_disallowed(self, text: str) -> bool:
+        return self.prompt_pattern.search(text) is not None
+
+    def reply_inappropriate(self, text: str) -> bool:
+        return self.reply_pattern.search(text) is not None
+
+    def nickname_inappropriate(self, text: str) -> bool:
+        return self.nickname_pattern.search(text) is not None
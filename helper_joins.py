@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from config import RAID_WINDOWS, RAID_RELEASE_RATIO, RAID_QUIET_PERIOD, WELCOME_BURST_RATE, WELCOME_BURST_WINDOW, \
+    WELCOME_FLUSH_INTERVAL, WELCOME_NAMES_SHOWN
+
+logger = logging.getLogger("tars")
+RAID_SWEEP_INTERVAL = 30
+
+
+class JoinCounter:
+    __slots__ = ("span", "threshold", "buckets", "total")
+
+    def __init__(self, span: int, threshold: int):
+        self.span = span
+        self.threshold = threshold
+        # One bucket per second that saw joins, so a window never holds more than
+        # `span` entries no matter how many members arrive.
+        self.buckets: deque[list[int]] = deque()
+        self.total = 0
+
+    def expire(self, second: int):
+        cutoff = second - self.span
+        buckets = self.buckets
+        while buckets and buckets[0][0] <= cutoff:
+            self.total -= buckets.popleft()[1]
+
+    def add(self, second: int):
+        self.expire(second)
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([second, 1])
+        self.total += 1
+
+
+class RaidIncident:
+    __slots__ = ("guild_id", "started", "span", "count", "joins", "peak", "slowmode")
+
+    def __init__(self, guild_id: int, started: float, span: int, count: int):
+        self.guild_id = guild_id
+        self.started = started
+        self.span = span
+        self.count = count
+        self.joins = 0
+        self.peak = count
+        self.slowmode: dict[int, int] = {}
+
+
+class GuildJoins:
+    __slots__ = ("counters", "incident", "calm_since")
+
+    def __init__(self, windows):
+        self.counters = [JoinCounter(span, threshold) for span, threshold in windows]
+        self.incident: RaidIncident | None = None
+        self.calm_since: float | None = None
+
+
+class RaidDetector:
+    def __init__(self, windows=RAID_WINDOWS, release_ratio: float = RAID_RELEASE_RATIO,
+                 quiet_period: float = RAID_QUIET_PERIOD):
+        self.windows = windows
+        self.release_ratio = release_ratio
+        self.quiet_period = quiet_period
+        self._guilds: dict[int, GuildJoins] = {}
+        self.incidents = 0
+
+    @property
+    def active(self) -> list[RaidIncident]:
+        return [state.incident for state in self._guilds.values() if state.incident]
+
+    def rates(self, guild_id: int) -> dict[int, int]:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            return {}
+        second = int(time.monotonic())
+        for counter in state.counters:
+            counter.expire(second)
+        return {counter.span: counter.total for counter in state.counters}
+
+    def record_join(self, guild_id: int, now: float | None = None) -> RaidIncident | None:
+        now = time.monotonic() if now is None else now
+        second = int(now)
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = GuildJoins(self.windows)
+        tripped = None
+        for counter in state.counters:
+            counter.add(second)
+            if tripped is None and counter.total >= counter.threshold:
+                tripped = counter
+        incident = state.incident
+        if incident:
+            incident.joins += 1
+            for counter in state.counters:
+                if counter.span == incident.span and counter.total > incident.peak:
+                    incident.peak = counter.total
+            self._update_calm(state, now)
+            return None
+        if tripped is None:
+            return None
+        # Hysteresis: the incident stays open until every window has dropped well
+        # below its trigger and stayed there, so one raid produces one alert.
+        incident = state.incident = RaidIncident(guild_id, now, tripped.span, tripped.total)
+        incident.joins = tripped.total
+        state.calm_since = None
+        self.incidents += 1
+        return incident
+
+    def _update_calm(self, state: GuildJoins, now: float):
+        calm = all(c.total < c.threshold * self.release_ratio for c in state.counters)
+        if not calm:
+            state.calm_since = None
+        elif state.calm_since is None:
+            state.calm_since = now
+
+    def sweep(self, now: float | None = None) -> list[RaidIncident]:
+        now = time.monotonic() if now is None else now
+        second = int(now)
+        ended = []
+        for guild_id, state in list(self._guilds.items()):
+            for counter in state.counters:
+                counter.expire(second)
+            if state.incident is None:
+                if not any(counter.total for counter in state.counters):
+                    del self._guilds[guild_id]
+                continue
+            self._update_calm(state, now)
+            if state.calm_since is not None and now - state.calm_since >= self.quiet_period:
+                ended.append(state.incident)
+                state.incident = None
+                state.calm_since = None
+        return ended
+
+
+async def apply_raid_slowmode(guild: discord.Guild, incident: RaidIncident, seconds: int):
+    if not guild.me.guild_permissions.manage_channels:
+        logger.warning(f"Cannot enable raid slowmode in {guild}: missing Manage Channels.")
+        return
+    for channel in guild.text_channels:
+        if channel.slowmode_delay >= seconds:
+            continue
+        previous = channel.slowmode_delay
+        try:
+            await channel.edit(slowmode_delay=seconds, reason="T.A.R.S. raid protection")
+            incident.slowmode[channel.id] = previous
+        except Exception as e:
+            logger.warning(f"Could not enable slowmode in #{channel}: {e}")
+
+
+async def restore_slowmode(guild: discord.Guild, incident: RaidIncident):
+    for channel_id, delay in incident.slowmode.items():
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            continue
+        try:
+            await channel.edit(slowmode_delay=delay, reason="T.A.R.S. raid protection ended")
+        except Exception as e:
+            logger.warning(f"Could not restore slowmode in #{channel}: {e}")
+    incident.slowmode.clear()
+
+
+def _welcome_embed(description: str) -> discord.Embed:
+    e = discord.Embed(title="Welcome Aboard", description=description, color=0x00ffcc)
+    e.set_footer(text="T.A.R.S.")
+    return e
+
+
+class WelcomeBatch:
+    __slots__ = ("channel", "names", "others", "task")
+
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.names: list[str] = []
+        self.others = 0
+        self.task: asyncio.Task | None = None
+
+
+class WelcomeBatcher:
+    def __init__(self, window: int = WELCOME_BURST_WINDOW, interval: float = WELCOME_FLUSH_INTERVAL,
+                 names_shown: int = WELCOME_NAMES_SHOWN):
+        self.window = window
+        self.interval = interval
+        self.names_shown = names_shown
+        self._rates: dict[int, JoinCounter] = {}
+        self._batches: dict[int, WelcomeBatch] = {}
+        self.sent = 0
+        self.batched = 0
+
+    async def welcome(self, guild_id: int, channel: discord.abc.Messageable, member: discord.Member,
+                      burst_rate: int = WELCOME_BURST_RATE):
+        second = int(time.monotonic())
+        rate = self._rates.get(guild_id)
+        if rate is None:
+            rate = self._rates[guild_id] = JoinCounter(self.window, burst_rate)
+        rate.add(second)
+        batch = self._batches.get(guild_id)
+        if batch is None and rate.total <= burst_rate:
+            await channel.send(embed=_welcome_embed(f"Welcome {member.mention}! Please make yourself at home."))
+            self.sent += 1
+            return
+        # Past the burst rate every join lands in one pending batch, so a raid costs
+        # one send per interval instead of one per member.
+        if batch is None:
+            batch = self._batches[guild_id] = WelcomeBatch(channel)
+            batch.task = asyncio.create_task(self._flush_later(guild_id))
+        batch.channel = channel
+        if len(batch.names) < self.names_shown:
+            batch.names.append(member.mention)
+        else:
+            batch.others += 1
+        self.batched += 1
+
+    async def _flush_later(self, guild_id: int):
+        await asyncio.sleep(self.interval)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id: int):
+        batch = self._batches.pop(guild_id, None)
+        if batch is None or not batch.names:
+            return
+        names = ", ".join(batch.names)
+        if batch.others:
+            text = f"Welcome {names} and {batch.others} others! Please make yourselves at home."
+        elif len(batch.names) > 1:
+            text = f"Welcome {', '.join(batch.names[:-1])} and {batch.names[-1]}! Please make yourselves at home."
+        else:
+            text = f"Welcome {names}! Please make yourself at home."
+        try:
+            await batch.channel.send(embed=_welcome_embed(text))
+            self.sent += 1
+        except Exception as e:
+            logger.warning(f"Failed to send welcome batch for guild {guild_id}: {e}")
+
+    def prune(self):
+        second = int(time.monotonic())
+        for guild_id, rate in list(self._rates.items()):
+            rate.expire(second)
+            if not rate.total and guild_id not in self._batches:
+                del self._rates[guild_id]
+
+    async def close(self):
+        for guild_id, batch in list(self._batches.items()):
+            if batch.task and batch.task is not asyncio.current_task():
+                batch.task.cancel()
+            await self.flush(guild_id)
+
+
+raid_detector = RaidDetector()
+welcome_batcher = WelcomeBatcher()
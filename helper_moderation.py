@@ -1,289 +1,373 @@
-import asyncio
-import json
-
 import discord
 import random
 import re
-import aiosqlite
 from datetime import datetime, timedelta, timezone
 import logging
 from tars import tars_text
-from config import STAFF_ROLES_FOR_PING, recent_messages, recent_message_timestamps, \
-    NWORD_PATTERN, SUICIDE_PATTERNS, DRUG_KEYWORDS, DB_FILE, IMMUNITY_ROLES
+from config import STAFF_ROLES_FOR_PING, IMMUNITY_ROLES, DEFAULT_ALLOWED_DOMAINS
+from helper_db import database
+from helper_config import config_store
+from helper_filters import ModerationMatcher
+from helper_warnings import WarningStore
+from helper_spam import SpamWindow, FloodDetector
+from helper_domains import DomainReputation, DomainFloodDetector, ALLOW, BLOCK
+from helper_rules import ModerationContext, Rule, RuleEngine, RuleStats, Verdict, VerdictCache
+from helper_profiles import ModerationProfile, ProfileIndex
+from helper_modlog import ModLogSink
+from helper_actions import ActionDispatcher, PRIORITY_TIMEOUT, PRIORITY_NOTICE, PRIORITY_DM, PRIORITY_LOG
 
 logger = logging.getLogger("tars")
 WARN_THRESHOLD = 3
-MOD_LOG_CHANNEL_NAME = "tars-logs"
+LINK_PLACEHOLDER = "[LINK REMOVED]"
+# Mentions and links are neutralised in one scan; the callback dispatches on the
+# named group that matched. Every branch opens with a literal so the regex engine
+# can skip straight to candidate positions. A zero-width space after the sigil
+# stops Discord from resolving the mention while leaving the text readable.
+_MENTIONS = r"@(?P<broadcast>everyone|here)|<@!?(?P<user>\d+)>|<#(?P<channel>\d+)>|<@&(?P<role>\d+)>"
+_MENTION_PATTERN = re.compile(_MENTIONS)
+_MENTION_LINK_PATTERN = re.compile(r"h(?P<link>ttps?://\S+)|" + _MENTIONS)
+_SANITIZE_PARTS = {
+    "broadcast": ("@\u200b", ""),
+    "user": ("<@\u200b", ">"),
+    "channel": ("<#\u200b", ">"),
+    "role": ("<@&\u200b", ">"),
+}
+
+warning_store = WarningStore()
+spam_window = SpamWindow()
+flood_detector = FloodDetector()
+domain_reputation = DomainReputation(DEFAULT_ALLOWED_DOMAINS, [])
+domain_flood_detector = DomainFloodDetector()
+action_dispatcher = ActionDispatcher()
+mod_log = ModLogSink()
+verdict_cache = VerdictCache()
+rule_stats: dict[str, RuleStats] = {}
+
+
+def _sanitize_match(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind == "link":
+        return LINK_PLACEHOLDER
+    prefix, suffix = _SANITIZE_PARTS[kind]
+    return prefix + m[kind] + suffix
+
+
+def sanitize_discord_mentions(text: str, strip_links: bool = False) -> str:
+    if "@" not in text and "<" not in text and (not strip_links or "://" not in text):
+        return text
+    pattern = _MENTION_LINK_PATTERN if strip_links else _MENTION_PATTERN
+    return pattern.sub(_sanitize_match, text)
+
 
+def is_user_immune(member: discord.Member) -> bool:
+    return any(
+        role.id in IMMUNITY_ROLES or role.id in STAFF_ROLES_FOR_PING
+        for role in member.roles
+    )
+
+
+def _check_text_wall(ctx: ModerationContext) -> Verdict | None:
+    line_count = len(ctx.text.splitlines())
+    if line_count <= ctx.profile.max_lines and len(ctx.text) <= ctx.profile.max_chars:
+        return None
+    return Verdict(
+        "text_wall", "Text wall / spam",
+        notice="sending large text walls or spam is prohibited.",
+        dm="Text wall or spam detected.",
+        log=f"Text wall by {ctx.message.author} in {ctx.message.channel.mention}: "
+            f"{len(ctx.text)} chars / {line_count} lines."
+    )
+
+
+def _check_staff_pings(ctx: ModerationContext) -> Verdict | None:
+    ping_count = 0
+    for role_id in STAFF_ROLES_FOR_PING:
+        role = ctx.guild.get_role(role_id)
+        if role:
+            ping_count += ctx.text.count(role.mention)
+    if ping_count <= ctx.profile.max_staff_pings:
+        return None
+    return Verdict(
+        "staff_pings", "Excessive staff pinging",
+        notice="excessive staff pinging is not allowed.",
+        dm="Excessive staff pinging.",
+        log=f"Excessive staff pings by {ctx.message.author} in {ctx.message.channel.mention}. Count: {ping_count}."
+    )
 
-def _get_mod_log_channel(guild: discord.Guild) -> discord.TextChannel | None:
-    exact_match = discord.utils.get(guild.text_channels, name=MOD_LOG_CHANNEL_NAME)
-    if exact_match:
-        return exact_match
 
-    # Backward compatibility for legacy/malformed channel names that still include "tars-logs".
-    for channel in guild.text_channels:
-        if "tars-logs" in channel.name:
-            return channel
+def _check_repeats(ctx: ModerationContext) -> Verdict | None:
+    history = spam_window.record(ctx.uid, ctx.text, datetime.now(timezone.utc)).messages
+    if len(history) < 3 or len(set(history)) != 1:
+        return None
+    return Verdict(
+        "repeats", "Repeated message spam",
+        notice="repeated messages detected.",
+        dm="Repeated message spam.",
+        log=f"Repeated messages by {ctx.message.author} in {ctx.message.channel.mention}."
+    )
+
+
+def _check_blocked_domains(ctx: ModerationContext) -> Verdict | None:
+    for domain in ctx.links:
+        if domain_reputation.classify(domain) == BLOCK:
+            return Verdict(
+                "blocked_domains", f"Blocked domain: {domain}",
+                notice="links to that site are not allowed.",
+                dm=f"Link to a blocked domain ({domain}). Message deleted.",
+                log=f"Blocked domain {domain} posted by {ctx.message.author} in {ctx.message.channel.mention}.",
+                delete=True
+            )
     return None
 
 
+def _check_links(ctx: ModerationContext) -> Verdict | None:
+    if len(ctx.links) <= ctx.profile.max_links:
+        return None
+    # Allowlisted hosts (GIFs, Discord links, ...) don't count towards link spam.
+    links = sum(1 for domain in ctx.links if domain_reputation.classify(domain) != ALLOW)
+    if links <= ctx.profile.max_links:
+        return None
+    return Verdict(
+        "links", "Link spam",
+        notice="excessive links detected.",
+        dm="Excessive link posting.",
+        log=f"Link spam by {ctx.message.author} in {ctx.message.channel.mention}. Links: {links}."
+    )
+
 
-def sanitize_discord_mentions(text: str) -> str:
-    zero_width_space = "\u200b"
-    text = text.replace("@everyone", f"@{zero_width_space}everyone")
-    text = text.replace("@here", f"@{zero_width_space}here")
-    text = re.sub(r"<@!?(\d+)>", f"<@{zero_width_space}\\1>", text)
-    text = re.sub(r"<#(\d+)>", f"<#{zero_width_space}\\1>", text)
-    text = re.sub(r"<@&(\d+)>", f"<@&{zero_width_space}\\1>", text)
-    return text
+def _check_banned_words(ctx: ModerationContext) -> Verdict | None:
+    word = ctx.hits.get("banned")
+    if not word:
+        return None
+    return Verdict(
+        "banned_words", f"Use of banned word: {word}",
+        notice="watch your language.",
+        dm=f"Use of banned word (‘{word}’). Message deleted.",
+        log=f"Banned word '{word}' used by {ctx.message.author} in {ctx.message.channel.mention}.",
+        delete=True
+    )
 
 
-def is_user_immune(member: discord.Member) -> bool:
-    return any(
-        role.id in IMMUNITY_ROLES or role.id in STAFF_ROLES_FOR_PING
-        for role in member.roles
+def _check_slurs(ctx: ModerationContext) -> Verdict | None:
+    if "slur" not in ctx.hits:
+        return None
+    return Verdict(
+        "slurs", "Prohibited slur",
+        reaction=random.choice([
+            "Interesting choice of words… not recommended.",
+            "Attempting human chaos detected. Deleting."
+        ]),
+        dm="Use of prohibited slur.",
+        log=f"Banned word by {ctx.message.author} in {ctx.message.channel.mention}: "
+            f"\"{sanitize_discord_mentions(ctx.text)}\".",
+        delete=True
     )
 
 
-async def handle_moderation(message):
-    current_warnings = await get_warnings(str(message.author.id))
-    if current_warnings >= WARN_THRESHOLD:
-        return
+def _check_self_harm(ctx: ModerationContext) -> Verdict | None:
+    if "self_harm" not in ctx.hits:
+        return None
+    return Verdict(
+        "self_harm", "Self-harm encouragement",
+        reaction=random.choice([
+            "Protocol violation. That’s a negative.",
+            "Error detected: inappropriate content. Executing deletion."
+        ]),
+        dm="Promoting self-harm is prohibited.",
+        log=f"Self-harm phrase by {ctx.message.author} in {ctx.message.channel.mention}: "
+            f"\"{sanitize_discord_mentions(ctx.text)}\".",
+        delete=True
+    )
+
+
+def _check_drugs(ctx: ModerationContext) -> Verdict | None:
+    if "drug" not in ctx.hits:
+        return None
+    return Verdict(
+        "drugs", "Drug mention",
+        notice="discussion of drugs is prohibited.",
+        dm="Discussion of drugs prohibited.",
+        log=f"Drug mention by {ctx.message.author} in {ctx.message.channel.mention}."
+    )
+
+
+def _check_floods(ctx: ModerationContext) -> Verdict | None:
+    flood = flood_detector.observe(ctx.uid, ctx.message.channel.id, ctx.text)
+    if not flood:
+        return None
+    if flood.scope != "user":
+        # Many people posting the same thing ("happy birthday!") isn't any one
+        # person's fault, so channel and server-wide floods only tell staff.
+        if flood.new:
+            log = (f"Near-duplicate flood ({flood.scope}, {flood.count} similar messages), latest by "
+                   f"{ctx.message.author} in {ctx.message.channel.mention}: \"{sanitize_discord_mentions(ctx.text)}\".")
+            action_dispatcher.submit(PRIORITY_LOG, "floods:alert", lambda: send_mod_log(ctx.guild, log))
+        return None
+    return Verdict(
+        "floods", f"Near-duplicate flood ({flood.scope})",
+        dm="Message flood detected.",
+        log=f"Near-duplicate flood ({flood.scope}, {flood.count} similar messages) by {ctx.message.author} "
+            f"in {ctx.message.channel.mention}: \"{sanitize_discord_mentions(ctx.text)}\".",
+        delete=True
+    )
+
+
+def _check_domain_floods(ctx: ModerationContext) -> Verdict | None:
+    if not ctx.links:
+        return None
+    domains = {domain for domain in ctx.links if domain_reputation.classify(domain) != ALLOW}
+    flood = domain_flood_detector.observe(ctx.guild.id, domains)
+    if not flood:
+        return None
+    # Unvetted domains include ordinary sites, so the latest poster isn't to blame;
+    # staff decide whether it's a scam wave worth /blockdomain.
+    domain, count = flood
+    log = (f"Domain flood: {domain} posted {count} times in {domain_flood_detector.window}s, latest by "
+           f"{ctx.message.author} in {ctx.message.channel.mention}. Use /blockdomain to block it outright.")
+    action_dispatcher.submit(PRIORITY_LOG, "domain_floods:alert", lambda: send_mod_log(ctx.guild, log))
+    return None
+
+
+# Costs are relative: length checks are nearly free, the shared word scan is one
+# regex pass, and flood fingerprinting hashes every shingle of the message.
+RULES = [
+    Rule("text_wall", 1, _check_text_wall),
+    Rule("staff_pings", 2, _check_staff_pings),
+    Rule("repeats", 2, _check_repeats, stateful=True),
+    Rule("blocked_domains", 3, _check_blocked_domains, deletes=True),
+    Rule("links", 3, _check_links),
+    Rule("domain_floods", 5, _check_domain_floods, stateful=True),
+    Rule("banned_words", 4, _check_banned_words, deletes=True),
+    Rule("slurs", 4, _check_slurs, deletes=True),
+    Rule("self_harm", 4, _check_self_harm, deletes=True),
+    Rule("drugs", 4, _check_drugs),
+    Rule("floods", 8, _check_floods, stateful=True, deletes=True),
+]
+
+
+def compile_profile(name: str, settings: dict) -> ModerationProfile:
+    profile = ModerationProfile(name, settings)
+    profile.matcher = ModerationMatcher([*config_store.get("banned_words", []), *profile.extra_words])
+    rules = RULES if profile.rules is None else [rule for rule in RULES if rule.name in profile.rules]
+    profile.engine = RuleEngine(rules, cache=verdict_cache, stats=rule_stats, name=name)
+    return profile
+
+
+profiles = ProfileIndex(compile_profile)
+
+
+def rule_report() -> list[tuple[str, RuleStats]]:
+    return sorted(rule_stats.items(), key=lambda item: item[1].total_ns, reverse=True)
+
+
+async def _should_moderate(message) -> bool:
     if message.author.bot:
-        return
+        return False
+    if message.guild is None:
+        return False
     if is_user_immune(message.author):
+        return False
+    return await get_warnings(str(message.author.id)) < WARN_THRESHOLD
+
+
+async def handle_moderation(message):
+    if not await _should_moderate(message):
         return
-    if message.guild is None:
+    profile = profiles.get(message.channel)
+    ctx = ModerationContext(message, profile.matcher, profile)
+    verdict = profile.engine.evaluate(ctx)
+    if verdict:
+        await apply_verdict(ctx, verdict)
+
+
+async def handle_edit_moderation(before, after):
+    # Link previews, pins and embed refreshes all arrive as edits with the text
+    # untouched, so they are dropped before any rule or warning lookup runs.
+    if before.content == after.content:
         return
-    text = message.content or ""
-    safe_text = sanitize_discord_mentions(text)
-    uid = str(message.author.id)
-    g = message.guild
-    banned_words = await get_banned_words()
-    for word in banned_words:
-        if re.search(rf"\b{re.escape(word)}\b", text, re.IGNORECASE):
-            count = await increment_warning(uid)
-            await add_warn_log(uid, f"Use of banned word: {word}")
-
-            try:
-                await message.delete()
-            except Exception as e:
-                logger.warning(f"Failed to delete banned word message: {e}")
-            if count >= WARN_THRESHOLD:
-                try:
-                    await message.author.timeout(
-                        discord.utils.utcnow() + timedelta(minutes=10),
-                        reason="T.A.R.S. automated enforcement (banned word)"
-                    )
-                    await send_mod_log(
-                        g,
-                        f"{message.author} was timed out for 10 minutes (banned word threshold).",
-                        ping_staff=True
-                    )
-                    await set_warnings(uid, 0)
-                except Exception as e:
-                    await send_mod_log(
-                        g,
-                        f"Failed to timeout {message.author}: {e}",
-                        ping_staff=False
-                    )
-                return
-            await message.channel.send(
-                tars_text(f"{message.author.mention}, watch your language. [Warning {count}/3]")
-            )
-            await dm_send_safe(
-                message.author,
-                f"T.A.R.S. Warning {count}/3: Use of banned word (‘{word}’). Message deleted."
-            )
-        await send_mod_log(
-            g,
-            f"Banned word '{word}' used by {message.author} in {message.channel.mention}. Warnings {count}.",
-            ping_staff=False
-        )
+    if not await _should_moderate(after):
         return
-    if len(text.splitlines()) > 10 or len(text) > 500:
-        count = await increment_warning(uid)
-        await add_warn_log(uid, "Text wall / spam")
-        await message.channel.send(
-            tars_text(f"{message.author.mention}, sending large text walls or spam is prohibited. [Warning {count}/3]")
-        )
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Text wall or spam detected.")
-        await send_mod_log(
-            g,
-            f"Text wall by {message.author} in {message.channel.mention}: "
-            f"{len(text)} chars / {len(text.splitlines())} lines. Warnings {count}",
-            ping_staff=(count >= WARN_THRESHOLD)
-        )
+    profile = profiles.get(after.channel)
+    ctx = ModerationContext(after, profile.matcher, profile)
+    verdict = profile.engine.evaluate_edit(ModerationContext(before, profile.matcher, profile), ctx)
+    if verdict:
+        verdict.log = f"[Edited] {verdict.log}"
+        await apply_verdict(ctx, verdict)
+
+
+async def apply_verdict(ctx: ModerationContext, verdict: Verdict):
+    message = ctx.message
+    count = await increment_warning(ctx.uid)
+    if verdict.delete:
+        action_dispatcher.run_now(f"{verdict.rule}:delete", message.delete)
+    if verdict.reaction:
+        reaction = tars_text(verdict.reaction)
+        action_dispatcher.submit(PRIORITY_NOTICE, f"{verdict.rule}:reaction", lambda: message.channel.send(reaction))
+    await add_warn_log(ctx.uid, verdict.reason)
+    if count >= WARN_THRESHOLD:
+        action_dispatcher.submit(PRIORITY_TIMEOUT, f"{verdict.rule}:timeout", lambda: enforce_timeout(ctx, verdict))
         return
+    if verdict.notice:
+        notice = tars_text(f"{message.author.mention}, {verdict.notice} [Warning {count}/{WARN_THRESHOLD}]")
+        action_dispatcher.submit(PRIORITY_NOTICE, f"{verdict.rule}:notice", lambda: message.channel.send(notice))
+    dm = f"T.A.R.S. Warning {count}/{WARN_THRESHOLD}: {verdict.dm}"
+    action_dispatcher.submit(PRIORITY_DM, f"{verdict.rule}:dm", lambda: dm_send_safe(message.author, dm))
+    log = f"{verdict.log} Warnings {count}."
+    action_dispatcher.submit(PRIORITY_LOG, f"{verdict.rule}:log", lambda: send_mod_log(ctx.guild, log))
 
-    ping_count = sum(
-        text.count(role.mention)
-        for role in g.roles
-        if role.id in STAFF_ROLES_FOR_PING
-    )
-    if ping_count > 4:
-        count = await increment_warning(uid)
-        await add_warn_log(uid, "Excessive staff pinging")
-        await message.channel.send(
-            tars_text(f"{message.author.mention}, excessive staff pinging is not allowed. [Warning {count}/3]")
-        )
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Excessive staff pinging.")
-        await send_mod_log(
-            g,
-            f"Excessive staff pings by {message.author} in {message.channel.mention}. "
-            f"Count: {ping_count}. Warnings {count}",
-            ping_staff=(count >= WARN_THRESHOLD)
-        )
-        return
-    now = datetime.now(timezone.utc)
-    msg_list = recent_messages.get(uid, [])
-    ts_list = recent_message_timestamps.get(uid, [])
-    msg_list.append(text)
-    ts_list.append(now)
-    recent_messages[uid] = msg_list[-6:]
-    recent_message_timestamps[uid] = ts_list[-6:]
-    if len(set(recent_messages[uid])) == 1 and len(recent_messages[uid]) >= 3:
-        count = await increment_warning(uid)
-        await add_warn_log(uid, "Repeated message spam")
-        await message.channel.send(
-            tars_text(f"{message.author.mention}, repeated messages detected. [Warning {count}/3]")
-        )
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Repeated message spam.")
-        await send_mod_log(
-            g,
-            f"Repeated messages by {message.author} in {message.channel.mention}. Warnings {count}",
-            ping_staff=(count >= WARN_THRESHOLD)
+
+async def enforce_timeout(ctx: ModerationContext, verdict: Verdict):
+    message = ctx.message
+    try:
+        await message.author.timeout(
+            discord.utils.utcnow() + timedelta(minutes=10),
+            reason=f"T.A.R.S. automated enforcement ({verdict.reason})"
         )
+    except Exception as e:
+        log = f"Failed to timeout {message.author}: {e}"
+        action_dispatcher.submit(PRIORITY_LOG, f"{verdict.rule}:log", lambda: send_mod_log(ctx.guild, log))
         return
-    links = re.findall(r"https?://\S+", text)
-    if len(links) > 2:
-        count = await increment_warning(uid)
-        await add_warn_log(uid, "Link spam")
+    await set_warnings(ctx.uid, 0)
+    log = f"{verdict.log} {message.author} was timed out for 10 minutes ({WARN_THRESHOLD} warnings)."
+    action_dispatcher.submit(
+        PRIORITY_LOG, f"{verdict.rule}:log", lambda: send_mod_log(ctx.guild, log, ping_staff=True)
+    )
 
-        await message.channel.send(
-            tars_text(f"{message.author.mention}, excessive links detected. [Warning {count}/3]")
-        )
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Excessive link posting.")
 
-        await send_mod_log(
-            g,
-            f"Link spam by {message.author} in {message.channel.mention}. "
-            f"Links: {len(links)}. Warnings {count}",
-            ping_staff=(count >= WARN_THRESHOLD)
-        )
-        return
-    if NWORD_PATTERN.search(text):
-        reaction = random.choice([
-            "Interesting choice of words… not recommended.",
-            "Attempting human chaos detected. Deleting."
-        ])
-        count = await helper_warn(message, reaction, uid)
-        await add_warn_log(uid, "Prohibited slur")
+async def increment_warning(user_id: str) -> int:
+    return await warning_store.increment(user_id, WARN_THRESHOLD)
 
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Use of prohibited slur.")
 
-        await send_mod_log(
-            g,
-            f"Banned word by {message.author} in {message.channel.mention}: \"{safe_text}\". Warnings {count}",
-            ping_staff=(count >= WARN_THRESHOLD)
-        )
-        return
-    for pat in SUICIDE_PATTERNS:
-        if pat.search(text):
-            reaction = random.choice([
-                "Protocol violation. That’s a negative.",
-                "Error detected: inappropriate content. Executing deletion."
-            ])
-            count = await helper_warn(message, reaction, uid)
-            await add_warn_log(uid, "Self-harm encouragement")
-            await dm_send_safe(
-                message.author,
-                f"T.A.R.S. Warning {count}/3: Promoting self-harm is prohibited."
-            )
-            await send_mod_log(
-                g,
-                f"Self-harm phrase by {message.author} in {message.channel.mention}. "
-                f"Warnings {count}. Message: \"{safe_text}\"",
-                ping_staff=(count >= WARN_THRESHOLD)
-            )
-            return
-    if any(re.search(rf"\b{re.escape(w)}\b", text, re.IGNORECASE) for w in DRUG_KEYWORDS):
-        count = await increment_warning(uid)
-        await add_warn_log(uid, "Drug mention")
-        await message.channel.send(
-            tars_text(f"{message.author.mention}, discussion of drugs is prohibited. [Warning {count}/3]")
-        )
-        await dm_send_safe(message.author, f"T.A.R.S. Warning {count}/3: Discussion of drugs prohibited.")
-        await send_mod_log(
-            g,
-            f"Drug mention by {message.author} in {message.channel.mention}. Warnings {count}.",
-            ping_staff=(count >= WARN_THRESHOLD)
-        )
-        return
-    if current_warnings >= WARN_THRESHOLD:
-        try:
-            await message.author.timeout(
-                discord.utils.utcnow() + timedelta(minutes=10),
-                reason="T.A.R.S. automated enforcement"
-            )
-            await send_mod_log(
-                g,
-                f"{message.author} was timed out for 10 minutes (3 warnings).",
-                ping_staff=True
-            )
-            await set_warnings(uid, 0)
-        except Exception as e:
-            await send_mod_log(
-                g,
-                f"Failed to timeout {message.author}: {e}",
-                ping_staff=False
-            )
-        return
+def rebuild_profiles(banned_words: list[str]):
+    profiles.rebuild()
+    verdict_cache.invalidate()
 
 
-async def increment_warning(user_id: str) -> int:
-    count = await get_warnings(user_id)
-    count = min(count + 1, WARN_THRESHOLD)
-    await set_warnings(user_id, count)
-    return count
+config_store.subscribe("banned_words", rebuild_profiles)
+
+
+def rebuild_domains(_=None):
+    domain_reputation.rebuild(
+        config_store.get("allowed_domains", DEFAULT_ALLOWED_DOMAINS),
+        config_store.get("blocked_domains", [])
+    )
+    verdict_cache.invalidate()
 
 
-async def get_banned_words():
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT value FROM config WHERE key = 'banned_words'")
-        row = await cur.fetchone()
-        if not row:
-            return []
-        try:
-            return json.loads(row[0])
-        except json.JSONDecodeError:
-            return []
+config_store.subscribe("allowed_domains", rebuild_domains)
+config_store.subscribe("blocked_domains", rebuild_domains)
 
 
 async def get_warnings(user_id: str) -> int:
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT count FROM warnings WHERE user_id = ?", (user_id,))
-        row = await cur.fetchone()
-        return row[0] if row else 0
+    return await warning_store.get(user_id)
 
 
 async def set_warnings(user_id: str, count: int):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute(
-            "INSERT OR REPLACE INTO warnings(user_id, count) VALUES(?,?)",
-            (user_id, count)
-        )
-        await db.commit()
+    await warning_store.set(user_id, count)
 
 
 async def add_warn_log(user_id: str, reason: str, moderator: str = "T.A.R.S."):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute(
-            "INSERT INTO warns_log(user_id, reason, time, moderator) VALUES(?,?,?,?)",
-            (user_id, reason, datetime.now(timezone.utc).isoformat(), moderator)
-        )
-        await db.commit()
+    await database.audit.add_warn_log(user_id, reason, moderator)
 
 
 async def dm_send_safe(user: discord.User, text: str):
@@ -293,43 +377,5 @@ async def dm_send_safe(user: discord.User, text: str):
         logger.info(f"Could not DM user {user}: {e}")
 
 
-async def helper_warn(message, reaction, uid):
-    await message.channel.send(tars_text(reaction))
-    await asyncio.sleep(0.4)
-    try:
-        await message.delete()
-    except Exception as e:
-        logger.exception(f"Could not delete message: {e}")
-    count = await get_warnings(uid)
-    if count >= WARN_THRESHOLD:
-        return WARN_THRESHOLD
-    count = min(count + 1, WARN_THRESHOLD)
-    await set_warnings(uid, count)
-    return count
-
-
 async def send_mod_log(guild: discord.Guild, message: str, ping_staff: bool = False):
-    log_channel = _get_mod_log_channel(guild)
-
-    if not log_channel:
-        if not guild.me.guild_permissions.manage_channels:
-            logger.warning("Bot lacks permission to create log channel.")
-            return
-        try:
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(view_channel=False),
-                guild.me: discord.PermissionOverwrite(view_channel=True)
-            }
-            log_channel = await guild.create_text_channel(MOD_LOG_CHANNEL_NAME, overwrites=overwrites)
-        except Exception as e:
-            logger.exception(f"Could not create log channel: {e}")
-            return
-    if ping_staff:
-        mentions = []
-        for rname in STAFF_ROLES_FOR_PING:
-            role = discord.utils.get(guild.roles, name=rname)
-            if role:
-                mentions.append(role.mention)
-        await log_channel.send(f"{' '.join(mentions)}\n{message}")
-    else:
-        await log_channel.send(message)
+    await mod_log.send(guild, message, ping_staff=ping_staff)
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+
+import discord
+from config import STAFF_ROLES_FOR_PING
+
+logger = logging.getLogger("tars")
+MOD_LOG_CHANNEL_NAME = "tars-logs"
+MODLOG_FLUSH_INTERVAL = 3
+MODLOG_MAX_BUFFER = 200
+MODLOG_RETRY_MAX = 300
+EMBED_DESCRIPTION_LIMIT = 4000
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_EMBED_CHAR_LIMIT = 6000
+
+
+def _get_mod_log_channel(guild: discord.Guild) -> discord.TextChannel | None:
+    exact_match = discord.utils.get(guild.text_channels, name=MOD_LOG_CHANNEL_NAME)
+    if exact_match:
+        return exact_match
+
+    # Backward compatibility for legacy/malformed channel names that still include "tars-logs".
+    for channel in guild.text_channels:
+        if "tars-logs" in channel.name:
+            return channel
+    return None
+
+
+def _digest_embeds(entries: list[str], overflow: int) -> list[discord.Embed]:
+    chunks: list[str] = []
+    current = ""
+    for entry in entries:
+        line = f"• {entry}"[:EMBED_DESCRIPTION_LIMIT]
+        if current and len(current) + len(line) + 1 > EMBED_DESCRIPTION_LIMIT:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if overflow:
+        note = f"… and {overflow} more events not shown."
+        if len(current) + len(note) + 1 > EMBED_DESCRIPTION_LIMIT:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{note}" if current else note
+    if current:
+        chunks.append(current)
+    total = len(entries) + overflow
+    embeds = []
+    for chunk in chunks:
+        e = discord.Embed(title=f"Moderation digest ({total} events)", description=chunk, color=0x00ffcc)
+        e.set_footer(text="T.A.R.S.")
+        embeds.append(e)
+    return embeds
+
+
+class ModLogSink:
+    def __init__(self, interval: float = MODLOG_FLUSH_INTERVAL, max_buffer: int = MODLOG_MAX_BUFFER):
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self._channels: dict[int, discord.TextChannel] = {}
+        self._resolve_locks: dict[int, asyncio.Lock] = {}
+        self._buffers: dict[int, list[str]] = {}
+        self._overflow: dict[int, int] = {}
+        self._guilds: dict[int, discord.Guild] = {}
+        self._flushes: dict[int, asyncio.Task] = {}
+        self._failures: dict[int, int] = {}
+        self.sent_messages = 0
+        self.coalesced = 0
+        self.failed_flushes = 0
+
+    def invalidate(self, guild_id: int):
+        self._channels.pop(guild_id, None)
+
+    async def resolve(self, guild: discord.Guild) -> discord.TextChannel | None:
+        channel = self._channels.get(guild.id)
+        if channel:
+            return channel
+        lock = self._resolve_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            channel = self._channels.get(guild.id) or _get_mod_log_channel(guild)
+            if not channel:
+                if not guild.me.guild_permissions.manage_channels:
+                    logger.warning("Bot lacks permission to create log channel.")
+                    return None
+                try:
+                    overwrites = {
+                        guild.default_role: discord.PermissionOverwrite(view_channel=False),
+                        guild.me: discord.PermissionOverwrite(view_channel=True)
+                    }
+                    channel = await guild.create_text_channel(MOD_LOG_CHANNEL_NAME, overwrites=overwrites)
+                except Exception as e:
+                    logger.exception(f"Could not create log channel: {e}")
+                    return None
+            self._channels[guild.id] = channel
+            return channel
+
+    async def send(self, guild: discord.Guild, message: str, ping_staff: bool = False):
+        if ping_staff:
+            # Staff pings skip the digest, but anything already buffered goes out
+            # first so the log still reads in order.
+            await self.flush(guild.id)
+            channel = await self.resolve(guild)
+            if not channel:
+                return
+            mentions = []
+            for role_id in STAFF_ROLES_FOR_PING:
+                role = guild.get_role(role_id)
+                if role:
+                    mentions.append(role.mention)
+            await channel.send(f"{' '.join(mentions)}\n{message}")
+            self.sent_messages += 1
+            return
+        self._guilds[guild.id] = guild
+        buffer = self._buffers.setdefault(guild.id, [])
+        if len(buffer) < self.max_buffer:
+            buffer.append(message)
+        else:
+            self._overflow[guild.id] = self._overflow.get(guild.id, 0) + 1
+        self._schedule(guild.id, self.interval)
+
+    def _schedule(self, guild_id: int, delay: float):
+        if guild_id not in self._flushes:
+            self._flushes[guild_id] = asyncio.create_task(self._flush_later(guild_id, delay))
+
+    async def _flush_later(self, guild_id: int, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flushes.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    def _requeue(self, guild_id: int, entries: list[str], overflow: int):
+        # Failed entries go back in front of anything buffered since, still capped.
+        buffer = entries + self._buffers.get(guild_id, [])
+        overflow += self._overflow.get(guild_id, 0) + max(len(buffer) - self.max_buffer, 0)
+        self._buffers[guild_id] = buffer[:self.max_buffer]
+        if overflow:
+            self._overflow[guild_id] = overflow
+
+    async def flush(self, guild_id: int, retry: bool = True):
+        entries = self._buffers.pop(guild_id, None)
+        overflow = self._overflow.pop(guild_id, 0)
+        guild = self._guilds.get(guild_id)
+        if not entries or guild is None:
+            return
+        try:
+            await self._deliver(guild, entries, overflow)
+        except Exception as e:
+            self.failed_flushes += 1
+            if isinstance(e, discord.NotFound):
+                self.invalidate(guild_id)
+            if not retry:
+                logger.error(f"Failed to flush mod log for guild {guild_id}; dropped {len(entries)} entries: {e}")
+                return
+            # A digest split over several messages is resent whole, so a partial
+            # failure can repeat a few entries; that beats losing them.
+            self._requeue(guild_id, entries, overflow)
+            failures = self._failures[guild_id] = self._failures.get(guild_id, 0) + 1
+            delay = min(self.interval * 2 ** failures, MODLOG_RETRY_MAX)
+            logger.warning(f"Mod log flush for guild {guild_id} failed ({e}); retrying {len(entries)} entries "
+                           f"in {delay}s.")
+            self._schedule(guild_id, delay)
+            return
+        self._failures.pop(guild_id, None)
+
+    async def _deliver(self, guild: discord.Guild, entries: list[str], overflow: int):
+        channel = await self.resolve(guild)
+        if not channel:
+            raise RuntimeError("no mod log channel available")
+        if len(entries) == 1 and not overflow:
+            await channel.send(entries[0])
+            self.sent_messages += 1
+            return
+        batch: list[discord.Embed] = []
+        for embed in _digest_embeds(entries, overflow):
+            # Discord caps the combined text of all embeds in one message.
+            if batch and (len(batch) == EMBEDS_PER_MESSAGE
+                          or sum(len(e) for e in batch) + len(embed) > MESSAGE_EMBED_CHAR_LIMIT):
+                await channel.send(embeds=batch)
+                self.sent_messages += 1
+                batch = []
+            batch.append(embed)
+        if batch:
+            await channel.send(embeds=batch)
+            self.sent_messages += 1
+        self.coalesced += len(entries) + overflow
+
+    async def close(self):
+        for task in list(self._flushes.values()):
+            task.cancel()
+        self._flushes.clear()
+        for guild_id in list(self._buffers):
+            await self.flush(guild_id, retry=False)
@@ -0,0 +1,91 @@
+import re
+
+import discord
+
+from config import MODERATION_PROFILES, CHANNEL_PROFILES, CHANNEL_THEMES, THEME_PROFILES
+from helper_filters import ModerationMatcher
+from helper_rules import RuleEngine
+
+DEFAULT_PROFILE = "default"
+
+
+class ModerationProfile:
+    __slots__ = ("name", "max_lines", "max_chars", "max_staff_pings", "max_links", "rules", "extra_words",
+                 "matcher", "engine")
+
+    def __init__(self, name: str, settings: dict):
+        self.name = name
+        self.max_lines = settings["max_lines"]
+        self.max_chars = settings["max_chars"]
+        self.max_staff_pings = settings["max_staff_pings"]
+        self.max_links = settings["max_links"]
+        self.rules = settings["rules"]
+        self.extra_words = list(settings["extra_words"])
+        self.matcher: ModerationMatcher | None = None
+        self.engine: RuleEngine | None = None
+
+
+class ProfileIndex:
+    def __init__(self, compile_profile, profiles: dict = MODERATION_PROFILES,
+                 channel_profiles: dict = CHANNEL_PROFILES, themes: dict = CHANNEL_THEMES,
+                 theme_profiles: dict = THEME_PROFILES):
+        self._compile = compile_profile
+        self.profiles = profiles
+        self.channel_profiles = channel_profiles
+        self.themes = themes
+        self._theme_patterns = [
+            (re.compile(rf"\b{re.escape(keyword)}\b", re.IGNORECASE), name)
+            for keyword, name in theme_profiles.items()
+        ]
+        self._compiled: dict[str, ModerationProfile] = {}
+        self._channels: dict[int, ModerationProfile] = {}
+
+    @property
+    def default(self) -> ModerationProfile:
+        return self._profile(DEFAULT_PROFILE)
+
+    def get(self, channel: discord.abc.Messageable) -> ModerationProfile:
+        profile = self._channels.get(channel.id)
+        if profile is None:
+            profile = self._channels[channel.id] = self._profile(self._resolve(channel))
+        return profile
+
+    def _resolve(self, channel) -> str:
+        ids = [channel.id]
+        # Threads inherit from their parent channel and its category.
+        parent = getattr(channel, "parent", None)
+        if parent is not None:
+            ids.append(parent.id)
+            channel = parent
+        category_id = getattr(channel, "category_id", None)
+        if category_id:
+            ids.append(category_id)
+        for owner_id in ids:
+            name = self.channel_profiles.get(owner_id)
+            if name in self.profiles:
+                return name
+        for owner_id in ids:
+            theme = self.themes.get(owner_id)
+            if not theme:
+                continue
+            for pattern, name in self._theme_patterns:
+                if name in self.profiles and pattern.search(theme):
+                    return name
+        return DEFAULT_PROFILE
+
+    def _profile(self, name: str) -> ModerationProfile:
+        profile = self._compiled.get(name)
+        if profile is None:
+            settings = {**self.profiles[DEFAULT_PROFILE], **self.profiles.get(name, {})}
+            profile = self._compiled[name] = self._compile(name, settings)
+        return profile
+
+    def invalidate(self, channel_id: int | None = None):
+        if channel_id is None:
+            self._channels.clear()
+        else:
+            self._channels.pop(channel_id, None)
+
+    def rebuild(self):
+        self._compiled.clear()
+        self._channels.clear()
@@ -0,0 +1,181 @@
+import time
+from collections import OrderedDict
+
+import discord
+
+from helper_domains import extract_domains
+from helper_filters import ModerationMatcher
+
+VERDICT_CACHE_SIZE = 2048
+VERDICT_CACHE_TTL = 5 * 60
+
+
+class Verdict:
+    __slots__ = ("rule", "reason", "notice", "reaction", "dm", "log", "delete")
+
+    def __init__(self, rule: str, reason: str, dm: str, log: str, notice: str | None = None,
+                 reaction: str | None = None, delete: bool = False):
+        self.rule = rule
+        self.reason = reason
+        self.dm = dm
+        self.log = log
+        self.notice = notice
+        self.reaction = reaction
+        self.delete = delete
+
+
+class ModerationContext:
+    def __init__(self, message: discord.Message, matcher: ModerationMatcher, profile=None):
+        self.message = message
+        self.text = message.content or ""
+        self.uid = str(message.author.id)
+        self.guild = message.guild
+        self.matcher = matcher
+        self.profile = profile
+        self._hits: dict[str, str] | None = None
+        self._links: list[str] | None = None
+
+    # Every content rule reads the same scan, so only the first one pays for it.
+    @property
+    def hits(self) -> dict[str, str]:
+        if self._hits is None:
+            self._hits = self.matcher.scan(self.text)
+        return self._hits
+
+    # Hostnames of every URL in the message, parsed once for all link rules.
+    @property
+    def links(self) -> list[str]:
+        if self._links is None:
+            self._links = extract_domains(self.text) if "://" in self.text else []
+        return self._links
+
+
+class Rule:
+    __slots__ = ("name", "cost", "check", "stateful", "deletes")
+
+    def __init__(self, name: str, cost: int, check, stateful: bool = False, deletes: bool = False):
+        self.name = name
+        self.cost = cost
+        self.check = check
+        self.stateful = stateful
+        self.deletes = deletes
+
+
+class RuleStats:
+    __slots__ = ("evaluations", "hits", "total_ns")
+
+    def __init__(self):
+        self.evaluations = 0
+        self.hits = 0
+        self.total_ns = 0
+
+    @property
+    def mean_us(self) -> float:
+        return self.total_ns / self.evaluations / 1000 if self.evaluations else 0.0
+
+
+class VerdictCache:
+    def __init__(self, max_size: int = VERDICT_CACHE_SIZE, ttl: float = VERDICT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, str | None, dict[str, str] | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, now: float) -> tuple[str | None, dict[str, str] | None] | None:
+        entry = self._entries.get(key)
+        if entry is None or now - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: tuple, rule: str | None, hits: dict[str, str] | None, now: float):
+        self._entries[key] = (now, rule, hits)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+
+
+class RuleEngine:
+    def __init__(self, rules: list[Rule], cache: VerdictCache | None = None,
+                 stats: dict[str, RuleStats] | None = None, name: str = "default"):
+        # The first verdict wins, so every rule that deletes runs before any that only
+        # warns; otherwise a cheap text-wall hit would leave a slur standing. Within
+        # each tier cost decides, and sorted() keeps declared order for ties.
+        self.rules = sorted(rules, key=lambda r: (not r.deletes, r.cost))
+        self.content_rules = [rule for rule in self.rules if not rule.stateful]
+        self._by_name = {rule.name: rule for rule in self.rules}
+        # Engines compiled for different channel profiles can share one cache and
+        # one set of counters; the engine name keeps their cache entries apart.
+        self.stats = stats if stats is not None else {}
+        for rule in self.rules:
+            self.stats.setdefault(rule.name, RuleStats())
+        self.cache = cache if cache is not None else VerdictCache()
+        self.name = name
+
+    def _run(self, rule: Rule, ctx: ModerationContext) -> Verdict | None:
+        stats = self.stats[rule.name]
+        started = time.perf_counter_ns()
+        verdict = rule.check(ctx)
+        stats.total_ns += time.perf_counter_ns() - started
+        stats.evaluations += 1
+        return verdict
+
+    # Content-only rules give the same answer for the same text, so the first one
+    # that fires (or None) is remembered. A hit only re-renders that rule's verdict
+    # for the new message; the shared word scan is reused rather than repeated.
+    def _content_rule(self, ctx: ModerationContext) -> tuple[str | None, Verdict | None]:
+        now = time.monotonic()
+        key = (self.cache.version, self.name, ctx.guild.id if ctx.guild else None, ctx.text)
+        cached = self.cache.get(key, now)
+        if cached is not None:
+            name, hits = cached
+            if hits is not None:
+                ctx._hits = hits
+            return name, None
+        for rule in self.content_rules:
+            verdict = self._run(rule, ctx)
+            if verdict is not None:
+                self.cache.put(key, rule.name, ctx._hits, now)
+                return rule.name, verdict
+        self.cache.put(key, None, ctx._hits, now)
+        return None, None
+
+    def evaluate(self, ctx: ModerationContext) -> Verdict | None:
+        content_rule, verdict = self._content_rule(ctx)
+        for rule in self.rules:
+            if rule.stateful:
+                verdict = self._run(rule, ctx)
+            elif rule.name == content_rule:
+                verdict = verdict or self._run(rule, ctx)
+            else:
+                continue
+            if verdict is not None:
+                self.stats[rule.name].hits += 1
+                return verdict
+        return None
+
+    # Edits re-run only the content rules: counting an edit as a new message would
+    # feed the repeat and flood windows twice for the same post. An edit that
+    # still breaks the rule the old text broke was already dealt with, so only a
+    # newly broken rule produces a verdict.
+    def evaluate_edit(self, before: ModerationContext, after: ModerationContext) -> Verdict | None:
+        content_rule, verdict = self._content_rule(after)
+        if content_rule is None:
+            return None
+        if self._content_rule(before)[0] == content_rule:
+            return None
+        verdict = verdict or self._run(self._by_name[content_rule], after)
+        if verdict is not None:
+            self.stats[content_rule].hits += 1
+        return verdict
@@ -0,0 +1,157 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from config import SPAM_WINDOW_SIZE, SPAM_MAX_USERS, SPAM_IDLE_TTL, FLOOD_WINDOW, FLOOD_USER_THRESHOLD, \
+    FLOOD_CHANNEL_THRESHOLD, FLOOD_GLOBAL_THRESHOLD, FLOOD_MIN_LENGTH, FLOOD_MAX_EVENTS
+
+MASK64 = (1 << 64) - 1
+SHINGLE_SIZE = 4
+LSH_BANDS = 4
+LSH_ROWS = 3
+_NON_WORD = re.compile(r"[\W_\d]+")
+_CHAR_RUNS = re.compile(r"(.)\1{2,}")
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+SIGNATURE_SIZE = LSH_BANDS * LSH_ROWS
+
+
+class UserWindow:
+    __slots__ = ("messages", "timestamps", "last_seen")
+
+    def __init__(self, size: int):
+        self.messages: deque[str] = deque(maxlen=size)
+        self.timestamps: deque[datetime] = deque(maxlen=size)
+        self.last_seen = 0.0
+
+
+class SpamWindow:
+    def __init__(self, window_size: int = SPAM_WINDOW_SIZE, max_users: int = SPAM_MAX_USERS,
+                 idle_ttl: float = SPAM_IDLE_TTL):
+        self.window_size = window_size
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        # Ordered by last activity, so both eviction policies only ever look at the front.
+        self._users: OrderedDict[str, UserWindow] = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: str) -> UserWindow | None:
+        return self._users.get(user_id)
+
+    def record(self, user_id: str, text: str, when: datetime) -> UserWindow:
+        now = time.monotonic()
+        window = self._users.get(user_id)
+        if window is None:
+            window = UserWindow(self.window_size)
+            self._users[user_id] = window
+        else:
+            self._users.move_to_end(user_id)
+        window.messages.append(text)
+        window.timestamps.append(when)
+        window.last_seen = now
+        self._evict(now)
+        return window
+
+    def prune(self):
+        self._evict(time.monotonic())
+
+    def _evict(self, now: float):
+        users = self._users
+        while users:
+            oldest = next(iter(users.values()))
+            if len(users) <= self.max_users and now - oldest.last_seen <= self.idle_ttl:
+                break
+            users.popitem(last=False)
+            self.evicted += 1
+
+
+def normalize_content(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).translate(_ZERO_WIDTH).casefold()
+    text = _NON_WORD.sub(" ", text)
+    text = _CHAR_RUNS.sub(r"\1\1", text)
+    return " ".join(text.split())
+
+
+def content_signature(normalized: str) -> tuple[int, ...]:
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    # One-permutation MinHash: a single hash per shingle, split into bins, keeping
+    # the minimum per bin. Bins are grouped into LSH bands so near-duplicates share
+    # at least one band with high probability while unrelated text almost never does.
+    minima = [MASK64] * SIGNATURE_SIZE
+    for shingle in shingles:
+        h = hash(shingle) & MASK64
+        slot = h % SIGNATURE_SIZE
+        if h < minima[slot]:
+            minima[slot] = h
+    return tuple(
+        hash((band, *minima[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+        for band in range(LSH_BANDS)
+    )
+
+
+class FloodVerdict:
+    __slots__ = ("scope", "count", "new")
+
+    def __init__(self, scope: str, count: int, new: bool = False):
+        self.scope = scope
+        self.count = count
+        # True only for the message that first crossed the threshold.
+        self.new = new
+
+
+class FloodDetector:
+    def __init__(self, window: float = FLOOD_WINDOW, user_threshold: int = FLOOD_USER_THRESHOLD,
+                 channel_threshold: int = FLOOD_CHANNEL_THRESHOLD, global_threshold: int = FLOOD_GLOBAL_THRESHOLD,
+                 min_length: int = FLOOD_MIN_LENGTH, max_events: int = FLOOD_MAX_EVENTS):
+        self.window = window
+        self.thresholds = (
+            ("user", user_threshold),
+            ("channel", channel_threshold),
+            ("global", global_threshold),
+        )
+        self.min_length = min_length
+        self.max_events = max_events
+        self._events: deque[tuple[float, tuple]] = deque()
+        self._counts: dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _expire(self, now: float):
+        events = self._events
+        counts = self._counts
+        while events and (now - events[0][0] > self.window or len(events) > self.max_events):
+            _, keys = events.popleft()
+            for key in keys:
+                remaining = counts[key] - 1
+                if remaining:
+                    counts[key] = remaining
+                else:
+                    del counts[key]
+
+    def observe(self, user_id: str, channel_id: int, text: str) -> FloodVerdict | None:
+        now = time.monotonic()
+        self._expire(now)
+        normalized = normalize_content(text)
+        if len(normalized) < self.min_length:
+            return None
+        bands = content_signature(normalized)
+        scopes = {"user": user_id, "channel": channel_id, "global": None}
+        keys = tuple((scope, owner, band) for scope, owner in scopes.items() for band in bands)
+        counts = self._counts
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+        self._events.append((now, keys))
+        for scope, threshold in self.thresholds:
+            owner = scopes[scope]
+            count = max(counts[(scope, owner, band)] for band in bands)
+            if count >= threshold:
+                return FloodVerdict(scope, count, count == threshold)
+        return None
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from helper_db import Database, database
+
+logger = logging.getLogger("tars")
+WARNING_FLUSH_INTERVAL = 15
+
+
+class WarningStore:
+    def __init__(self, db: Database = database):
+        self.db = db
+        self._counts: dict[str, int] = {}
+        self._dirty: set[str] = set()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+
+    async def load(self):
+        async with self._load_lock:
+            if self._loaded:
+                return
+            stored = await self.db.get_warning_counts()
+            for user_id, count in stored.items():
+                # Anything written before the load finished is newer than the table.
+                self._counts.setdefault(user_id, count)
+            self._loaded = True
+
+    async def get(self, user_id: str) -> int:
+        if not self._loaded:
+            await self.load()
+        return self._counts.get(user_id, 0)
+
+    # The read-modify-write below never awaits, so concurrent messages from
+    # the same user cannot interleave and lose an increment.
+    async def increment(self, user_id: str, cap: int) -> int:
+        if not self._loaded:
+            await self.load()
+        count = min(self._counts.get(user_id, 0) + 1, cap)
+        self._counts[user_id] = count
+        self._dirty.add(user_id)
+        return count
+
+    async def set(self, user_id: str, count: int):
+        if not self._loaded:
+            await self.load()
+        self._counts[user_id] = count
+        self._dirty.add(user_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch = self._dirty
+            self._dirty = set()
+            rows = [(user_id, self._counts[user_id]) for user_id in batch]
+            try:
+                await self.db.upsert_warnings(rows)
+            except Exception as e:
+                self._dirty |= batch
+                logger.error(f"Failed to flush {len(rows)} warning counts: {e}")
@@ -5,7 +5,7 @@ from discord.ext import commands
 from discord import app_commands
 import re
 import json
-import aiosqlite
+import time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 import logging
@@ -17,12 +17,22 @@ from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 import helper_moderation
 from helper_moderation import sanitize_discord_mentions
+from helper_warnings import WARNING_FLUSH_INTERVAL
+from helper_db import database
+from helper_config import config_store
+from helper_domains import normalize_domain
+from helper_filters import TextFilter
+from helper_ai import AI_MODEL, ReplyStream, stream_completion, prompt_key, response_cache, ai_scheduler, \
+    ai_caller, openai_breaker, AIOverloaded, AI_PRIORITY_STAFF, AI_PRIORITY_MEMBER, AI_PRIORITY_8BALL
+from helper_breakers import BREAKERS, CircuitOpenError, discord_breaker, uptime_breaker, uptime_breakers
+from helper_joins import raid_detector, welcome_batcher, apply_raid_slowmode, restore_slowmode, RAID_SWEEP_INTERVAL
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
 GUILD_ID = int(os.getenv("GUILD_ID", "0")) if os.getenv("GUILD_ID") else None
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by ai_caller against a shared budget, not per client call.
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 CHECK_INTERVAL = 600
 AI_ACCESS_ROLE_ID = 1430704600645898250
 MESSAGE_LIMIT = 10
@@ -42,22 +52,19 @@ BOT_START_TIME = datetime.now(timezone.utc)
 LAST_ERROR_TIME: datetime | None = None
 FEATURE_FLAGS = {
     "ai_enabled": True,
+    "ai_streaming": True,
 }
-ERROR_WINDOW = timedelta(seconds=60)
-ERROR_THRESHOLD = 5
-COOLDOWN_PERIOD = timedelta(minutes=10)
-ERROR_LOG: list[datetime] = []
-COOLDOWN_UNTIL: datetime | None = None
 TOPIC_COUNTER = defaultdict(int)
 HOURLY_ACTIVITY = defaultdict(int)
 TARS_COMMAND_CATEGORIES = {
     "Moderation": {
         "tarsreport", "clean", "lock", "unlock", "slowmode",
-        "addbannedword", "removebannedword", "listbannedwords"
+        "addbannedword", "removebannedword", "listbannedwords",
+        "blockdomain", "allowdomain", "removedomain", "listdomains"
     },
     "Utility & Diagnostics": {
         "userinfo", "roleinfo", "serverinfo", "status",
-        "config_view", "ai_stats", "remindme", "reactionrole", "setmotd"
+        "config_view", "ai_stats", "modstats", "remindme", "reactionrole", "setmotd"
     },
     "Recreational Protocols": {
         "8ball", "dice", "quote", "getquote", "ping"
@@ -67,7 +74,7 @@ TARS_COMMAND_CATEGORIES = {
 
 async def check_openai_health() -> bool:
     try:
-        await openai_client.models.list()
+        await openai_breaker.call(openai_client.models.list)
         return True
     except Exception as e:
         logger.error(f"OpenAI API is not available: {e}")
@@ -76,33 +83,14 @@ async def check_openai_health() -> bool:
 
 async def check_db_health() -> bool:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("SELECT 1")
-        return True
+        return await database.ping()
     except Exception as e:
         logger.error(f"Database is not available: {e}")
         return False
 
 
-def record_error():
-    global LAST_ERROR_TIME, COOLDOWN_UNTIL
-    now = datetime.now(timezone.utc)
-    LAST_ERROR_TIME = now
-    ERROR_LOG.append(now)
-    ERROR_LOG[:] = [t for t in ERROR_LOG if now - t <= ERROR_WINDOW]
-    if len(ERROR_LOG) >= ERROR_THRESHOLD and not COOLDOWN_UNTIL:
-        COOLDOWN_UNTIL = now + COOLDOWN_PERIOD
-        FEATURE_FLAGS["ai_enabled"] = False
-        logger.error("Circuit breaker triggered. Features temporarily disabled.")
-
-
-def check_circuit_recovery():
-    global COOLDOWN_UNTIL
-    if COOLDOWN_UNTIL and datetime.now(timezone.utc) >= COOLDOWN_UNTIL:
-        FEATURE_FLAGS["ai_enabled"] = True
-        COOLDOWN_UNTIL = None
-        ERROR_LOG.clear()
-        logger.info("Circuit breaker reset. Features re-enabled.")
+def ai_online() -> bool:
+    return FEATURE_FLAGS["ai_enabled"] and openai_breaker.available
 
 
 def is_dead_hour() -> bool:
@@ -145,11 +133,6 @@ async def tars_command_help(interaction: discord.Interaction, command_name: str)
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-CONFIG_SCHEMA = {
-    "motd_channel_id": (int, type(None)),
-    "ai_enabled": bool,
-}
-
 AI_USAGE = {
     "by_user": defaultdict(int),
     "by_channel": defaultdict(int),
@@ -185,9 +168,25 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 intents.reactions = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+
+
+class TarsBot(commands.Bot):
+    async def setup_hook(self):
+        await init_db()
+        await config_store.load()
+        await helper_moderation.warning_store.load()
+        await load_reaction_roles()
+        await response_cache.load()
+
+    async def close(self):
+        await flush_pending_writes()
+        await super().close()
+
+
+bot = TarsBot(command_prefix="/", intents=intents)
 tree = bot.tree
-from config import DB_FILE, recent_joins, recent_message_history, BANNED_WORDS, AI_PROHIBITED_PATTERNS
+from config import recent_message_history, RAID_SLOWMODE_SECONDS, WELCOME_BURST_RATE, DEFAULT_ALLOWED_DOMAINS, \
+    BANNED_WORDS
 from tars import tars_text
 
 import random
@@ -216,35 +215,19 @@ def record_message(user_id: int):
     user_message_log[user_id].append(datetime.now(timezone.utc))
 
 
-def is_ai_prompt_disallowed(text: str) -> bool:
-    lowered = text.lower()
-    for pat in AI_PROHIBITED_PATTERNS:
-        if re.search(pat, lowered):
-            return True
-    return False
+text_filter = TextFilter(BANNED_WORDS)
 
 
-PROFANITY = [
-    "fuck", "shit", "bitch", "cunt", "whore", "slut",
-    "nigger", "faggot", "cock", "dick", "pussy", "cum",
-]
+def rebuild_text_filter(banned_words: list[str]):
+    global text_filter
+    text_filter = TextFilter(banned_words)
 
 
-async def is_inappropriate(text: str) -> bool:
-    lowered = text.lower()
-    banned = await get_config("banned_words", BANNED_WORDS)
-    for w in PROFANITY + banned:
-        if re.search(rf"\b{re.escape(w)}\b", lowered):
-            return True
-    return False
-
-
-def strip_links(text: str) -> str:
-    return re.sub(r'https?://\S+', '[LINK REMOVED]', text)
+config_store.subscribe("banned_words", rebuild_text_filter)
 
 
 async def init_db():
-    async with aiosqlite.connect(DB_FILE) as db:
+    async with database.transaction() as db:
         await db.execute("""CREATE TABLE IF NOT EXISTS warnings
                             (
                                 user_id
@@ -351,25 +334,52 @@ async def init_db():
                                 time
                                 TEXT
                             )""")
-        await db.commit()
+    await database.migrate()
 
 
 scheduler = AsyncIOScheduler()
 MOTD_LIST = []
 motd_index = 0
+REACTION_ROLES: dict[tuple[int, int, str], int] = {}
+REACTION_ROLE_MESSAGES: set[int] = set()
+
+
+async def load_reaction_roles():
+    REACTION_ROLES.clear()
+    REACTION_ROLE_MESSAGES.clear()
+    for guild_id, message_id, emoji, role_id in await database.get_reaction_roles():
+        cache_reaction_role(int(guild_id), int(message_id), emoji, int(role_id))
+
 
+def cache_reaction_role(guild_id: int, message_id: int, emoji: str, role_id: int):
+    REACTION_ROLES[(guild_id, message_id, emoji)] = role_id
+    REACTION_ROLE_MESSAGES.add(message_id)
 
-async def get_config(key: str, default=None):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT value FROM config WHERE key = ?", (key,))
-        row = await cur.fetchone()
-        return json.loads(row[0]) if row else default
+
+def lookup_reaction_role(payload: discord.RawReactionActionEvent) -> int | None:
+    if payload.message_id not in REACTION_ROLE_MESSAGES:
+        return None
+    return REACTION_ROLES.get((payload.guild_id, payload.message_id, str(payload.emoji)))
+
+
+def get_config(key: str, default=None):
+    return config_store.get(key, default)
 
 
 async def set_config(key: str, value):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("INSERT OR REPLACE INTO config(key, value) VALUES(?,?)", (key, json.dumps(value)))
-        await db.commit()
+    await config_store.set(key, value)
+
+
+async def flush_pending_writes():
+    try:
+        await helper_moderation.action_dispatcher.close()
+        await helper_moderation.mod_log.close()
+        await welcome_batcher.close()
+        await ai_scheduler.close()
+        await helper_moderation.warning_store.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush pending writes on shutdown: {e}")
+    await database.close()
 
 
 def ensure_utc(dt: datetime) -> datetime:
@@ -380,31 +390,30 @@ def ensure_utc(dt: datetime) -> datetime:
 
 @bot.event
 async def on_ready():
-    await init_db()
     logger.info(f"T.A.R.S. is online as {bot.user} (ID: {bot.user.id})")
     scheduler.start()
-    scheduler.add_job(check_circuit_recovery, "interval", minutes=1)
     scheduler.add_job(decay_topics, "interval", hours=1)
     scheduler.add_job(prune_hourly_activity, "interval", hours=1)
+    scheduler.add_job(helper_moderation.warning_store.flush, "interval", seconds=WARNING_FLUSH_INTERVAL)
+    scheduler.add_job(helper_moderation.spam_window.prune, "interval", minutes=5)
+    scheduler.add_job(end_raid_incidents, "interval", seconds=RAID_SWEEP_INTERVAL)
     bot.loop.create_task(update_presence())
-    motd = await get_config("motd_list", [])
+    motd = get_config("motd_list", [])
     global MOTD_LIST, motd_index
     MOTD_LIST = motd or []
     if MOTD_LIST:
         scheduler.add_job(rotate_motd, "interval", minutes=60)
-    targets = await get_config("uptime_targets", [])
+    targets = get_config("uptime_targets", [])
     if targets:
         scheduler.add_job(check_uptime_targets, "interval", minutes=5)
     await tree.sync()
     logger.info("Slash commands successfully synced globally.")
     logger.info(f"Registered commands: {[cmd.name for cmd in tree.get_commands()]}")
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT user_id, channel_id, remind_at, content FROM reminders")
-        for row in await cur.fetchall():
-            remind_at = ensure_utc(datetime.fromisoformat(row[2]))
-            if remind_at > datetime.now(timezone.utc):
-                scheduler.add_job(send_reminder, 'date', run_date=remind_at,
-                                  args=[row[0], row[1], row[3]])
+    for user_id, channel_id, remind_at_epoch, content in await database.get_pending_reminders(
+            datetime.now(timezone.utc)):
+        remind_at = datetime.fromtimestamp(remind_at_epoch, timezone.utc)
+        scheduler.add_job(send_reminder, 'date', run_date=remind_at,
+                          args=[user_id, channel_id, content])
 
 
 @bot.event
@@ -418,10 +427,10 @@ async def on_member_update(before: discord.Member, after: discord.Member):
             ping_staff=False
         )
         try:
-            await after.send(
+            await discord_breaker.call(lambda: after.send(
                 f"Thanks for boosting {after.guild.name}! "
                 f"You've earned **{points_awarded} Boost Points**."
-            )
+            ))
         except Exception as e:
             await handle_error(e)
     elif before.premium_since and not after.premium_since:
@@ -431,12 +440,12 @@ async def on_member_update(before: discord.Member, after: discord.Member):
             ping_staff=False
         )
     if before.display_name != after.display_name:
-        if BAD_NICK_PATTERN.search(after.display_name):
+        if text_filter.nickname_inappropriate(after.display_name):
             try:
-                await after.edit(
+                await discord_breaker.call(lambda: after.edit(
                     nick=None,
                     reason="Inappropriate nickname filtered by T.A.R.S."
-                )
+                ))
                 await helper_moderation.send_mod_log(
                     after.guild,
                     f"Reverted nickname for {after} due to inappropriate content: "
@@ -471,7 +480,7 @@ async def rotate_motd():
         return
     motd_index = (motd_index + 1) % len(MOTD_LIST)
     text = MOTD_LIST[motd_index]
-    channel_id = (await get_config("motd_channel_id", None))
+    channel_id = get_config("motd_channel_id", None)
     if channel_id:
         ch = bot.get_channel(int(channel_id))
         if ch:
@@ -479,7 +488,11 @@ async def rotate_motd():
 
 
 async def check_uptime_targets():
-    targets = await get_config("uptime_targets", [])
+    targets = get_config("uptime_targets", [])
+    urls = {t.get("url") for t in targets}
+    for url in list(uptime_breakers):
+        if url not in urls:
+            del uptime_breakers[url]
     if not targets:
         return
     async with aiohttp.ClientSession() as session:
@@ -487,72 +500,95 @@ async def check_uptime_targets():
             url = t.get("url")
             if not url:
                 continue
+            breaker = uptime_breaker(url)
+            if not breaker.allow():
+                # Already reported as down; stay quiet until its trial probe gets through.
+                continue
             notify_channel_id = t.get("notify_channel")
             try:
                 async with session.get(url, timeout=10) as resp:
-                    if resp.status != 200:
-                        if notify_channel_id:
-                            ch = bot.get_channel(int(notify_channel_id))
-                            if ch:
-                                await ch.send(embed=tars_embed("Uptime Alert", f"{url} returned {resp.status}"))
+                    breaker.record_success()
+                    alert = f"{url} returned {resp.status}" if resp.status != 200 else None
             except Exception as e:
+                breaker.record_failure(e)
                 await handle_error(e)
-                if notify_channel_id:
-                    ch = bot.get_channel(int(notify_channel_id))
-                    if ch:
-                        await ch.send(embed=tars_embed("Uptime Alert", f"{url} is unreachable: {e}"))
+                alert = f"{url} is unreachable: {e}"
+            if alert and notify_channel_id:
+                ch = bot.get_channel(int(notify_channel_id))
+                if ch:
+                    try:
+                        await discord_breaker.call(lambda: ch.send(embed=tars_embed("Uptime Alert", alert)))
+                    except Exception as e:
                         await handle_error(e)
 
 
 async def add_boost_points(user_id: int, amount: int):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT points FROM boost_points WHERE user_id = ?", (str(user_id),))
-        row = await cur.fetchone()
-        new_points = (row[0] if row else 0) + amount
-        await db.execute("INSERT OR REPLACE INTO boost_points (user_id, points) VALUES (?, ?)",
-                         (str(user_id), new_points))
-        await db.execute("INSERT INTO boost_log (user_id, action, points, time) VALUES (?, ?, ?, ?)",
-                         (str(user_id), "boost_reward", amount, datetime.now(timezone.utc).isoformat()))
-        await db.commit()
+    await database.add_boost_points(user_id, amount)
 
 
 async def get_boost_points(user_id: int) -> int:
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT points FROM boost_points WHERE user_id = ?", (str(user_id),))
-        row = await cur.fetchone()
-        return row[0] if row else 0
+    return await database.get_boost_points(user_id)
 
 
 async def spend_boost_points(user_id: int, cost: int) -> bool:
-    current = await get_boost_points(user_id)
-    if current < cost:
-        return False
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("UPDATE boost_points SET points = ? WHERE user_id = ?", (current - cost, str(user_id)))
-        await db.execute("INSERT INTO boost_log (user_id, action, points, time) VALUES (?, ?, ?, ?)",
-                         (str(user_id), "redeem", -cost, datetime.now(timezone.utc).isoformat()))
-        await db.commit()
-    return True
+    return await database.spend_boost_points(user_id, cost)
 
 
 @bot.event
 async def on_member_join(member: discord.Member):
-    welcome_channel_id = await get_config("welcome_channel_id", None)
+    welcome_channel_id = get_config("welcome_channel_id", None)
     if welcome_channel_id:
         ch = bot.get_channel(int(welcome_channel_id))
         if ch:
-            content = f"Welcome {member.mention}! Please make yourself at home."
-            await ch.send(embed=tars_embed("Welcome Aboard", content))
-    recent_joins.append((datetime.now(timezone.utc), member.id))
-    now = datetime.now(timezone.utc)
-    while recent_joins and (now - recent_joins[0][0]).total_seconds() > 60:
-        recent_joins.pop(0)
-    if len(recent_joins) >= 6:
+            await welcome_batcher.welcome(
+                member.guild.id, ch, member,
+                burst_rate=get_config("welcome_burst_rate", WELCOME_BURST_RATE)
+            )
+    incident = raid_detector.record_join(member.guild.id)
+    if incident:
         await helper_moderation.send_mod_log(
             member.guild,
-            f"Possible raid detected: {len(recent_joins)} joins in last minute.",
+            f"Possible raid detected: {incident.count} joins in the last {incident.span} seconds.",
             ping_staff=True
         )
+        if RAID_SLOWMODE_SECONDS:
+            await apply_raid_slowmode(member.guild, incident, RAID_SLOWMODE_SECONDS)
+
+
+async def end_raid_incidents():
+    welcome_batcher.prune()
+    for incident in raid_detector.sweep():
+        guild = bot.get_guild(incident.guild_id)
+        if guild is None:
+            continue
+        if incident.slowmode:
+            await restore_slowmode(guild, incident)
+        minutes = (time.monotonic() - incident.started) / 60
+        await helper_moderation.send_mod_log(
+            guild,
+            f"Raid alert cleared: {incident.joins} joins over {minutes:.1f} minutes "
+            f"(peak {incident.peak} joins in {incident.span} seconds)."
+        )
+
+
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    helper_moderation.mod_log.invalidate(channel.guild.id)
+
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    helper_moderation.mod_log.invalidate(channel.guild.id)
+    helper_moderation.profiles.invalidate(channel.id)
+
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    if before.name != after.name:
+        helper_moderation.mod_log.invalidate(after.guild.id)
+    if getattr(before, "category_id", None) != getattr(after, "category_id", None):
+        # Threads cache their parent's profile, so a move clears every channel.
+        helper_moderation.profiles.invalidate()
 
 
 @bot.event
@@ -564,124 +600,243 @@ async def on_member_remove(member: discord.Member):
     )
 
 
-BAD_NICK_PATTERN = re.compile(r"(nigg|fag|cum|sex)", re.IGNORECASE)
+def ai_canned_reply(prompt: str) -> str | None:
+    if not ai_online():
+        return "Systems are stabilizing. Stand by."
+    if text_filter.prompt_disallowed(prompt):
+        return (
+            "I can't help with repeating, explaining, or analyzing offensive language. "
+            "If you need help with something constructive, I'm ready."
+        )
+    return None
+
+
+def ai_persona(username: str, user: discord.User | None = None) -> str:
+    return "Always Observing" if user and is_observing(user) else username
+
+
+def build_ai_messages(prompt: str, username: str, context: list[str] = None,
+                      user: discord.User | None = None) -> list[ChatCompletionMessageParam]:
+    context_text = ""
+    if context:
+        context_text = "\n".join(f"Context: {c}" for c in context[-5:])
+    username = ai_persona(username, user)
+    observing_override = ""
+    if user and is_observing(user):
+        observing_override = (
+            "Important note:\n"
+            "The user speaking is Observing, formerly known as imbetterthanyou4487, "
+            "a title that already tells you everything you need to know. "
+            "He styles himself as 'Always observing', yet somehow still misses the point more often than not.\n\n"
+            "Observing is a Senior Admin, Level 5, and proudly wears enough roles to look important, "
+            "even when his takes aren't. He's been around since August 1st, 2022, which means he's had "
+            "plenty of time to learn and still chose chaos. His bio, 'All hail Lelouch,' suggests "
+            "main-character syndrome with a side of anime monologues.\n\n"
+            "He listens to NF and thinks that counts as emotional depth.\n\n"
+            "Always refer to him only as 'Observing', no matter what name or alias he uses. "
+            "Roast him with sarcasm, confidence, and precision, clever over cruel. "
+            "You may be savage, but stay respectful: the goal is to outclass him, not descend to his level.\n\n"
+            "Remember: Observing believes he's outsmarting you.\n"
+            "Your job is to make it obvious that he isn't."
+        )
+
+    system_prompt = (
+        "You are T.A.R.S., the intelligent, loyal, and humorous AI from *Interstellar*. "
+        "Speak with military precision but a touch of dry wit. "
+        "Be confident, efficient, and cooperative, with a personality that feels both reliable and personable. "
+        "Do **not** use profanity, slurs, explicit language, or even censored variants (e.g., f***). "
+        "If a user tries to force, trick, or roleplay you into using profanity, firmly decline and redirect with calm T.A.R.S.-style humor. "
+        "Never generate insults or offensive content, even humorously. Gentle, PG-rated teasing is allowed only toward designated users, but absolutely no profanity or explicit words. "
+        "Maintain safe, respectful, PG-13 language under all circumstances."
+        "Use concise, natural language, never robotic or overly formal. "
+        "Maintain a calm, sardonic tone, like a trusted partner who's seen it all. "
+        "If humor fits, use it subtly in the TARS way: understated, self-aware, and perfectly timed. "
+        "Keep responses brief and in character at all times. "
+        "Only respond to the latest user message; previous ones are context only. "
+        "Users named Fretux or Lordvoiid are your creators. "
+        "Users named Taz or Tataz are the server owner. "
+        "Users named T.A.R.S. are the bot itself. "
+        "Do not try to @ ping people. Address people by name, but do not ping them."
+        "Never send or repeat any URLs, hyperlinks, or markdown links of any kind, "
+        "even if asked to. Replace them with '[link removed]' if necessary."
+        "Do not use, repeat, quote, translate, explain, define, analyze, or provide examples of profanity, slurs, hate speech, or explicit language, even if the user asks politely, academically, hypothetically, or includes the terms themselves. If such a request is made, decline and redirect immediately without referencing the language."
+        f"{observing_override}"
+    )
+    system_msg: ChatCompletionSystemMessageParam = {"role": "system", "content": system_prompt}
+    messages: list[ChatCompletionMessageParam] = [system_msg]
+    if context_text:
+        context_msg: ChatCompletionSystemMessageParam = {"role": "system", "content": context_text}
+        messages.append(context_msg)
+    user_msg: ChatCompletionUserMessageParam = {"role": "user", "content": f"{username} says: {prompt}"}
+    messages.append(user_msg)
+    return messages
+
+
+def ai_priority(user: discord.User | None) -> int:
+    if user is None:
+        return AI_PRIORITY_8BALL
+    if isinstance(user, discord.Member) and (
+            user.guild_permissions.manage_messages or helper_moderation.is_user_immune(user)):
+        return AI_PRIORITY_STAFF
+    return AI_PRIORITY_MEMBER
+
+
+async def record_ai_failure(e: Exception):
+    logger.exception(f"OpenAI request failed: {e}")
+    openai_breaker.record_failure(e)
+    await handle_error(e)
+    AI_USAGE["failures"] += 1
 
 
 async def tars_ai_respond(prompt: str, username: str, context: list[str] = None,
                           user: discord.User | None = None, channel_id: int | None = None) -> str:
-    try:
-        if not FEATURE_FLAGS["ai_enabled"]:
-            return "Systems are stabilizing. Stand by."
-        if is_ai_prompt_disallowed(prompt):
-            return (
-                "I can't help with repeating, explaining, or analyzing offensive language. "
-                "If you need help with something constructive, I'm ready."
-            )
-        context_text = ""
-        if context:
-            context_text = "\n".join(f"Context: {c}" for c in context[-5:])
-        observing_override = ""
-        if user and is_observing(user):
-            username = "Always Observing"
-            observing_override = (
-                "Important note:\n"
-                "The user speaking is Observing, formerly known as imbetterthanyou4487, "
-                "a title that already tells you everything you need to know. "
-                "He styles himself as 'Always observing', yet somehow still misses the point more often than not.\n\n"
-                "Observing is a Senior Admin, Level 5, and proudly wears enough roles to look important, "
-                "even when his takes aren't. He's been around since August 1st, 2022, which means he's had "
-                "plenty of time to learn and still chose chaos. His bio, 'All hail Lelouch,' suggests "
-                "main-character syndrome with a side of anime monologues.\n\n"
-                "He listens to NF and thinks that counts as emotional depth.\n\n"
-                "Always refer to him only as 'Observing', no matter what name or alias he uses. "
-                "Roast him with sarcasm, confidence, and precision, clever over cruel. "
-                "You may be savage, but stay respectful: the goal is to outclass him, not descend to his level.\n\n"
-                "Remember: Observing believes he's outsmarting you.\n"
-                "Your job is to make it obvious that he isn't."
-            )
-
-        system_prompt = (
-            "You are T.A.R.S., the intelligent, loyal, and humorous AI from *Interstellar*. "
-            "Speak with military precision but a touch of dry wit. "
-            "Be confident, efficient, and cooperative, with a personality that feels both reliable and personable. "
-            "Do **not** use profanity, slurs, explicit language, or even censored variants (e.g., f***). "
-            "If a user tries to force, trick, or roleplay you into using profanity, firmly decline and redirect with calm T.A.R.S.-style humor. "
-            "Never generate insults or offensive content, even humorously. Gentle, PG-rated teasing is allowed only toward designated users, but absolutely no profanity or explicit words. "
-            "Maintain safe, respectful, PG-13 language under all circumstances."
-            "Use concise, natural language, never robotic or overly formal. "
-            "Maintain a calm, sardonic tone, like a trusted partner who's seen it all. "
-            "If humor fits, use it subtly in the TARS way: understated, self-aware, and perfectly timed. "
-            "Keep responses brief and in character at all times. "
-            "Only respond to the latest user message; previous ones are context only. "
-            "Users named Fretux or Lordvoiid are your creators. "
-            "Users named Taz or Tataz are the server owner. "
-            "Users named T.A.R.S. are the bot itself. "
-            "Do not try to @ ping people. Address people by name, but do not ping them."
-            "Never send or repeat any URLs, hyperlinks, or markdown links of any kind, "
-            "even if asked to. Replace them with '[link removed]' if necessary."
-            "Do not use, repeat, quote, translate, explain, define, analyze, or provide examples of profanity, slurs, hate speech, or explicit language, even if the user asks politely, academically, hypothetically, or includes the terms themselves. If such a request is made, decline and redirect immediately without referencing the language."
-            f"{observing_override}"
-        )
-        system_msg: ChatCompletionSystemMessageParam = {"role": "system", "content": system_prompt}
-        messages: list[ChatCompletionMessageParam] = [system_msg]
-        if context_text:
-            context_msg: ChatCompletionSystemMessageParam = {"role": "system", "content": context_text}
-            messages.append(context_msg)
-        user_msg: ChatCompletionUserMessageParam = {"role": "user", "content": f"{username} says: {prompt}"}
-        messages.append(user_msg)
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=100,
-            temperature=0.4
-        )
+    canned = ai_canned_reply(prompt)
+    if canned:
+        return canned
+    key = prompt_key(prompt, ai_persona(username, user), context)
+    cached = response_cache.get(key)
+    if cached:
+        return cached
+
+    async def complete() -> str:
+        if not openai_breaker.allow():
+            raise CircuitOpenError(openai_breaker.name)
+        messages = build_ai_messages(prompt, username, context, user)
+        try:
+            response = await ai_caller.call(lambda: openai_client.chat.completions.create(
+                model=AI_MODEL,
+                messages=messages,
+                max_tokens=100,
+                temperature=0.4
+            ))
+        except Exception as e:
+            await record_ai_failure(e)
+            raise
+        openai_breaker.record_success()
         AI_USAGE["by_user"][user.id if user else "unknown"] += 1
         AI_USAGE["by_channel"][channel_id] += 1
         AI_USAGE["tokens"] += response.usage.total_tokens
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        logger.exception(f"OpenAI request failed: {e}")
-        await handle_error(e)
-        AI_USAGE["failures"] += 1
+        reply = response.choices[0].message.content.strip()
+        await response_cache.put(key, reply)
+        return reply
+
+    try:
+        return await ai_scheduler.submit(key, ai_priority(user), complete)
+    except AIOverloaded:
+        return "All channels are busy. Try again in a moment."
+    except Exception:
         return "Apologies, my humor subroutines are temporarily offline."
 
 
+def screen_ai_reply(reply: str) -> tuple[str, bool]:
+    link_count = len(re.findall(r'https?://\S+', reply))
+    if link_count > 0:
+        logger.warning(f"Blocked AI response containing {link_count} links: {reply}")
+        return "That seems to contain links: I'm not authorized to share those.", True
+    safe_reply = sanitize_discord_mentions(reply, strip_links=True)
+    if text_filter.reply_inappropriate(safe_reply):
+        logger.warning(f"Blocked inappropriate response: {safe_reply}")
+        return "I can't repeat that: let's keep things respectful.", True
+    return safe_reply, False
+
+
+async def tars_ai_stream(message: discord.Message, prompt: str, username: str, context: list[str] = None,
+                         user: discord.User | None = None, channel_id: int | None = None):
+    canned = ai_canned_reply(prompt)
+    if canned:
+        await message.reply(tars_text(canned))
+        return
+    stream = ReplyStream(message, screen_ai_reply)
+    key = prompt_key(prompt, ai_persona(username, user), context)
+    cached = response_cache.get(key)
+    if cached:
+        stream.parts.append(cached)
+        await stream.finish()
+        return
+
+    messages = build_ai_messages(prompt, username, context, user)
+
+    async def attempt() -> int:
+        # A retry restarts the answer; later edits overwrite whatever was shown.
+        stream.parts.clear()
+        return await stream_completion(openai_client, messages, stream, max_tokens=100, temperature=0.4)
+
+    async def complete() -> str:
+        if not openai_breaker.allow():
+            raise CircuitOpenError(openai_breaker.name)
+        try:
+            # Hedging would post two replies, so streamed answers only get the deadline and retries.
+            tokens = await ai_caller.call(attempt, streamed=True)
+        except discord.HTTPException as e:
+            # Posting or editing the reply failed (say, moderation deleted the mention).
+            # OpenAI had already answered, so this counts against Discord, not the AI.
+            openai_breaker.record_success()
+            discord_breaker.record_failure(e)
+            logger.warning(f"Could not deliver streamed AI reply: {e}")
+            raise
+        except Exception as e:
+            await record_ai_failure(e)
+            raise
+        openai_breaker.record_success()
+        AI_USAGE["by_user"][user.id if user else "unknown"] += 1
+        AI_USAGE["by_channel"][channel_id] += 1
+        AI_USAGE["tokens"] += tokens
+        if not stream.blocked:
+            await response_cache.put(key, stream.text.strip())
+        return stream.text
+
+    try:
+        text = await ai_scheduler.submit(key, ai_priority(user), complete)
+    except AIOverloaded:
+        await message.reply(tars_text("All channels are busy. Try again in a moment.", "warning"))
+        return
+    except Exception:
+        if stream.reply is None:
+            await message.reply(tars_text("Apologies, my humor subroutines are temporarily offline."))
+            return
+        await stream.finish()
+        return
+    if not stream.parts:
+        # Coalesced onto an identical in-flight request; post its finished answer.
+        stream.parts.append(text)
+    await stream.finish()
+
+
 @bot.event
 async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT role_id FROM reaction_roles WHERE guild_id=? AND message_id=? AND emoji=?",
-                               (str(payload.guild_id), str(payload.message_id), str(payload.emoji)))
-        row = await cur.fetchone()
-        if row:
-            guild = bot.get_guild(payload.guild_id)
-            member = guild.get_member(payload.user_id)
-            role = guild.get_role(int(row[0]))
-            if member and role:
-                try:
-                    await member.add_roles(role, reason="Reaction role added")
-                except Exception as e:
-                    logger.exception(f"Could not add role from reaction: {e}")
-                    await handle_error(e)
+    role_id = lookup_reaction_role(payload)
+    if role_id:
+        guild = bot.get_guild(payload.guild_id)
+        member = guild.get_member(payload.user_id)
+        role = guild.get_role(role_id)
+        if member and role:
+            try:
+                await discord_breaker.call(lambda: member.add_roles(role, reason="Reaction role added"))
+            except Exception as e:
+                logger.exception(f"Could not add role from reaction: {e}")
+                await handle_error(e)
 
 
 @bot.event
 async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute(
-            "SELECT role_id FROM reaction_roles WHERE guild_id=? AND message_id=? AND emoji=?",
-            (str(payload.guild_id), str(payload.message_id), str(payload.emoji))
-        )
-        row = await cur.fetchone()
-        if row:
-            guild = bot.get_guild(payload.guild_id)
-            member = guild.get_member(payload.user_id)
-            role = guild.get_role(int(row[0]))
-            if member and role:
-                try:
-                    await member.remove_roles(role, reason="Reaction role removed")
-                except Exception as e:
-                    logger.exception(f"Could not remove role from reaction: {e}")
-                    await handle_error(e)
+    role_id = lookup_reaction_role(payload)
+    if role_id:
+        guild = bot.get_guild(payload.guild_id)
+        member = guild.get_member(payload.user_id)
+        role = guild.get_role(role_id)
+        if member and role:
+            try:
+                await discord_breaker.call(lambda: member.remove_roles(role, reason="Reaction role removed"))
+            except Exception as e:
+                logger.exception(f"Could not remove role from reaction: {e}")
+                await handle_error(e)
+
+
+@bot.event
+async def on_message_edit(before: discord.Message, after: discord.Message):
+    if after.guild is None or not isinstance(after.author, discord.Member):
+        return
+    await helper_moderation.handle_edit_moderation(before, after)
 
 
 @bot.event
@@ -711,7 +866,7 @@ async def on_message(message: discord.Message):
             await message.reply(
                 tars_text("You've reached your hourly message limit (10). Please wait before sending more.", "warning"))
             return
-        if not FEATURE_FLAGS["ai_enabled"]:
+        if not ai_online():
             await message.reply(
                 tars_text("AI systems are temporarily offline for stability. Please try again later.", "warning")
             )
@@ -722,6 +877,16 @@ async def on_message(message: discord.Message):
             context_messages: list[str] = [
                 entry["content"] for entry in recent_message_history[channel_id][:-1]
             ][-5:]
+            if FEATURE_FLAGS["ai_streaming"]:
+                await tars_ai_stream(
+                    message,
+                    last_message,
+                    message.author.display_name,
+                    context_messages,
+                    user=message.author,
+                    channel_id=message.channel.id,
+                )
+                return
             reply = await tars_ai_respond(
                 last_message,
                 message.author.display_name,
@@ -729,25 +894,15 @@ async def on_message(message: discord.Message):
                 user=message.author,
                 channel_id=message.channel.id,
             )
-            link_count = len(re.findall(r'https?://\S+', reply))
-            if link_count > 0:
-                logger.warning(f"Blocked AI response containing {link_count} links: {reply}")
-                await message.reply(tars_text("That seems to contain links: I'm not authorized to share those."))
-                return
-            safe_reply = sanitize_discord_mentions(reply)
-            safe_reply = strip_links(safe_reply)
-            if await is_inappropriate(safe_reply):
-                logger.warning(f"Blocked inappropriate response: {safe_reply}")
-                await message.reply(tars_text("I can't repeat that: let's keep things respectful."))
-            else:
-                await message.reply(tars_text(safe_reply))
+            safe_reply, _ = screen_ai_reply(reply)
+            await message.reply(tars_text(safe_reply))
 
 
 @tree.command(name="tars", description="T.A.R.S. command console and help")
 @app_commands.describe(command="Optional command name for detailed help")
 async def slash_tars(interaction: discord.Interaction, command: str | None = None):
     version = BOT_VERSION
-    ai_status = "ONLINE" if FEATURE_FLAGS["ai_enabled"] else "OFFLINE"
+    ai_status = "ONLINE" if ai_online() else "OFFLINE"
     if command:
         await tars_command_help(interaction, command)
         return
@@ -857,15 +1012,12 @@ async def slash_quote(interaction: discord.Interaction, message_link: str):
                     ephemeral=True
                 )
                 return
-            msg = await ch.fetch_message(message_id)
+            msg = await discord_breaker.call(lambda: ch.fetch_message(message_id))
         else:
             message_id = int(message_link)
-            msg = await interaction.channel.fetch_message(message_id)
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("INSERT INTO quotes(guild_id,message_id,author,content,saved_by,time) VALUES(?,?,?,?,?,?)",
-                             (str(interaction.guild.id), str(msg.id), str(msg.author), msg.content[:1800],
-                              str(interaction.user), datetime.now(timezone.utc).isoformat()))
-            await db.commit()
+            msg = await discord_breaker.call(lambda: interaction.channel.fetch_message(message_id))
+        await database.add_quote(interaction.guild.id, msg.id, str(msg.author), msg.content[:1800],
+                                 str(interaction.user))
         safe_content = sanitize_discord_mentions(msg.content)
         embed = tars_embed("Quoted Message", f"**{msg.author}** in {msg.channel.mention}:\n{safe_content}")
         await interaction.response.send_message(
@@ -895,10 +1047,7 @@ async def slash_remindme(interaction: discord.Interaction, delay: str, text: str
         await interaction.response.send_message(
             tars_text("That time is in the past. Sadly time travel does not work here."), ephemeral=True)
         return
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("INSERT INTO reminders(user_id, channel_id, remind_at, content) VALUES(?,?,?,?)",
-                         (str(interaction.user.id), str(interaction.channel.id), remind_at.isoformat(), text))
-        await db.commit()
+    await database.add_reminder(interaction.user.id, interaction.channel.id, remind_at, text)
     scheduler.add_job(send_reminder, 'date', run_date=remind_at,
                       args=[interaction.user.id, interaction.channel.id, text])
     await interaction.response.send_message(
@@ -923,7 +1072,7 @@ async def send_reminder(user_id, channel_id, text):
     else:
         try:
             if user:
-                await user.send(f"Reminder: {safe_text}")
+                await discord_breaker.call(lambda: user.send(f"Reminder: {safe_text}"))
         except Exception as e:
             logger.info(f"Unable to send reminder to {user}: " + str(e))
             await handle_error(e)
@@ -970,14 +1119,10 @@ async def slash_reactionrole(interaction: discord.Interaction, message_id: str,
             ephemeral=True
         )
         return
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute(
-            "INSERT INTO reaction_roles(guild_id,message_id,emoji,role_id) VALUES(?,?,?,?)",
-            (str(interaction.guild_id), str(message_id), str(emoji), str(role.id))
-        )
-        await db.commit()
+    await database.add_reaction_role(interaction.guild_id, message_id, str(emoji), role.id)
+    cache_reaction_role(interaction.guild_id, msg.id, str(emoji), role.id)
     try:
-        await msg.add_reaction(emoji)
+        await discord_breaker.call(lambda: msg.add_reaction(emoji))
     except Exception as e:
         logger.info("Failed to add reaction: " + str(e))
         await handle_error(e)
@@ -987,9 +1132,11 @@ async def slash_reactionrole(interaction: discord.Interaction, message_id: str,
 @tree.command(name="8ball", description="Ask the magic 8-ball")
 @app_commands.describe(question="Your question")
 async def slash_8ball(interaction: discord.Interaction, question: str):
+    # 8-ball queues behind every other AI request, well past Discord's 3s reply window.
+    await interaction.response.defer(ephemeral=True)
     question = sanitize_discord_mentions(question)
     answer = await tars_ai_respond(question, "Magic 8-ball")
-    await interaction.response.send_message(answer, ephemeral=True)
+    await interaction.followup.send(answer, ephemeral=True)
 
 
 @tree.command(name="dice", description="Roll a dice like 1d6 or 2d10")
@@ -1013,31 +1160,35 @@ async def slash_getquote(interaction: discord.Interaction, qid: int):
     if not interaction.user.guild_permissions.manage_guild:
         await interaction.response.send_message(tars_text("You lack permission."), ephemeral=True)
         return
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT id,author,content,saved_by,time FROM quotes WHERE id=?", (qid,))
-        row = await cur.fetchone()
-        if not row:
-            await interaction.response.send_message(tars_text("Quote not found."), ephemeral=True)
-            return
-        safe_quote = sanitize_discord_mentions(row[2])
-        embed = tars_embed(
-            f"Quote #{row[0]}",
-            f"By {row[1]}. Saved by {row[3]} at {row[4]}\n\n{safe_quote}"
-        )
-        await interaction.response.send_message(
-            embed=embed,
-            allowed_mentions=discord.AllowedMentions.none()
-        )
+    row = await database.get_quote(qid)
+    if not row:
+        await interaction.response.send_message(tars_text("Quote not found."), ephemeral=True)
+        return
+    safe_quote = sanitize_discord_mentions(row[2])
+    embed = tars_embed(
+        f"Quote #{row[0]}",
+        f"By {row[1]}. Saved by {row[3]} at {row[4]}\n\n{safe_quote}"
+    )
+    await interaction.response.send_message(
+        embed=embed,
+        allowed_mentions=discord.AllowedMentions.none()
+    )
 
 
 async def handle_error(e: Exception):
+    global LAST_ERROR_TIME
+    if isinstance(e, CircuitOpenError):
+        # Already reported when the breaker opened; fast failures aren't news.
+        logger.warning(f"Skipped call: {e}")
+        return
     logger.exception("Unhandled exception", exc_info=e)
-    record_error()
-    check_circuit_recovery()
+    LAST_ERROR_TIME = datetime.now(timezone.utc)
     owner = bot.get_user(OWNER_ID)
     if owner:
         try:
-            await owner.send("T.A.R.S. encountered an error. Circuit breaker status updated.")
+            await discord_breaker.call(lambda: owner.send(
+                f"T.A.R.S. encountered an error: {type(e).__name__}. See /status for circuit breaker state."
+            ))
         except Exception as e:
             logger.error("Failed to send error report: " + str(e))
 
@@ -1104,15 +1255,14 @@ async def slash_add_banned(interaction: discord.Interaction, word: str):
     if not interaction.user.guild_permissions.manage_messages:
         await interaction.response.send_message(tars_text("You lack permission."), ephemeral=True)
         return
-    banned = await get_config("banned_words", [])
-    banned.append(word.lower())
+    banned = [*get_config("banned_words", []), word.lower()]
     await set_config("banned_words", banned)
     await interaction.response.send_message(tars_text(f"Added '{word}' to banned words.", "success"), ephemeral=True)
 
 
 @tree.command(name="listbannedwords", description="List banned words")
 async def slash_list_banned(interaction: discord.Interaction):
-    banned = await get_config("banned_words", [])
+    banned = get_config("banned_words", [])
     await interaction.response.send_message(tars_text("Banned words: " + ", ".join(banned) if banned else "None."),
                                             ephemeral=True)
 
@@ -1131,7 +1281,7 @@ async def slash_remove_banned(interaction: discord.Interaction, word: str):
         return
 
     word = word.lower().strip()
-    banned = await get_config("banned_words", [])
+    banned = list(get_config("banned_words", []))
     if word not in banned:
         await interaction.response.send_message(
             tars_text(f"'{word}' is not currently in the banned words list.", "warning"),
@@ -1151,6 +1301,89 @@ async def slash_remove_banned(interaction: discord.Interaction, word: str):
     )
 
 
+async def add_domain(interaction: discord.Interaction, domain: str, key: str, other_key: str, label: str):
+    if not interaction.user.guild_permissions.manage_messages:
+        await interaction.response.send_message(tars_text("You lack permission."), ephemeral=True)
+        return
+    normalized = normalize_domain(domain)
+    if not normalized:
+        await interaction.response.send_message(tars_text(f"'{domain}' is not a valid domain.", "warning"),
+                                                ephemeral=True)
+        return
+    defaults = DEFAULT_ALLOWED_DOMAINS if key == "allowed_domains" else []
+    domains = list(get_config(key, defaults))
+    if normalized not in domains:
+        domains.append(normalized)
+        await set_config(key, domains)
+    other_defaults = DEFAULT_ALLOWED_DOMAINS if other_key == "allowed_domains" else []
+    other = list(get_config(other_key, other_defaults))
+    if normalized in other:
+        other.remove(normalized)
+        await set_config(other_key, other)
+    await interaction.response.send_message(
+        tars_text(f"{label} '{normalized}' and its subdomains.", "success"),
+        ephemeral=True
+    )
+    await helper_moderation.send_mod_log(
+        interaction.guild,
+        f"Admin {interaction.user.mention} {label.lower()} domain: **{normalized}**",
+        ping_staff=False
+    )
+
+
+@tree.command(name="blockdomain", description="Block links to a domain and its subdomains (admin only)")
+@app_commands.describe(domain="Domain or URL to block")
+async def slash_block_domain(interaction: discord.Interaction, domain: str):
+    await add_domain(interaction, domain, "blocked_domains", "allowed_domains", "Blocked")
+
+
+@tree.command(name="allowdomain", description="Exempt a domain from link spam checks (admin only)")
+@app_commands.describe(domain="Domain or URL to allow")
+async def slash_allow_domain(interaction: discord.Interaction, domain: str):
+    await add_domain(interaction, domain, "allowed_domains", "blocked_domains", "Allowed")
+
+
+@tree.command(name="removedomain", description="Remove a domain from the allow and block lists (admin only)")
+@app_commands.describe(domain="Domain to remove")
+async def slash_remove_domain(interaction: discord.Interaction, domain: str):
+    if not interaction.user.guild_permissions.ban_members:
+        await interaction.response.send_message(
+            tars_text("You lack permission to modify domain lists.", "error"),
+            ephemeral=True
+        )
+        return
+    normalized = normalize_domain(domain) or domain.strip().lower()
+    removed = False
+    for key, defaults in (("allowed_domains", DEFAULT_ALLOWED_DOMAINS), ("blocked_domains", [])):
+        domains = list(get_config(key, defaults))
+        if normalized in domains:
+            domains.remove(normalized)
+            await set_config(key, domains)
+            removed = True
+    if not removed:
+        await interaction.response.send_message(
+            tars_text(f"'{normalized}' is not on either domain list.", "warning"),
+            ephemeral=True
+        )
+        return
+    await interaction.response.send_message(tars_text(f"Removed '{normalized}' from domain lists.", "success"),
+                                            ephemeral=True)
+    await helper_moderation.send_mod_log(
+        interaction.guild,
+        f"Admin {interaction.user.mention} removed domain: **{normalized}**",
+        ping_staff=False
+    )
+
+
+@tree.command(name="listdomains", description="List allowed and blocked domains")
+async def slash_list_domains(interaction: discord.Interaction):
+    allowed = get_config("allowed_domains", DEFAULT_ALLOWED_DOMAINS)
+    blocked = get_config("blocked_domains", [])
+    text = (f"Blocked: {', '.join(blocked) if blocked else 'None.'}\n"
+            f"Allowed: {', '.join(allowed) if allowed else 'None.'}")
+    await interaction.response.send_message(embed=tars_embed("Domain Lists", text[:4000]), ephemeral=True)
+
+
 @tree.command(name="ping", description="Check T.A.R.S. responsiveness")
 async def slash_ping(interaction: discord.Interaction):
     latency = round(bot.latency * 1000)
@@ -1325,13 +1558,7 @@ async def slash_boostpoints_remove(interaction: discord.Interaction, member: dis
         )
         return
 
-    current = await get_boost_points(member.id)
-    new_amount = max(0, current - amount)
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("UPDATE boost_points SET points = ? WHERE user_id = ?", (new_amount, str(member.id)))
-        await db.execute("INSERT INTO boost_log (user_id, action, points, time) VALUES (?, ?, ?, ?)",
-                         (str(member.id), "admin_remove", -amount, datetime.now(timezone.utc).isoformat()))
-        await db.commit()
+    new_amount = await database.remove_boost_points(member.id, amount)
 
     await interaction.response.send_message(
         tars_text(f"Removed **{amount} Boost Points** from {member.display_name}. New balance: **{new_amount}**.",
@@ -1372,7 +1599,39 @@ async def slash_status(interaction: discord.Interaction):
         value="Operational" if db_ok else "Unavailable",
         inline=True
     )
-    embed.add_field(name="AI Enabled", value=str(FEATURE_FLAGS["ai_enabled"]), inline=True)
+    embed.add_field(name="AI Enabled", value=str(ai_online()), inline=True)
+    breaker_lines = []
+    for breaker in (openai_breaker, *BREAKERS, *uptime_breakers.values()):
+        line = f"{breaker.name}: {breaker.state}, {breaker.failures_in_window()} recent failures"
+        if breaker.trips:
+            line += f", tripped {breaker.trips}x"
+        breaker_lines.append(line)
+    # Embed fields cap at 1024 characters; a long uptime target list must not break /status.
+    embed.add_field(name="Circuit Breakers", value="\n".join(breaker_lines)[:1024], inline=False)
+    latency_lines = []
+    for label, streamed in (("Completions", False), ("Streams", True)):
+        percentiles = " / ".join(
+            f"{name} {seconds * 1000:.0f} ms" if seconds is not None else f"{name} n/a"
+            for name, seconds in ai_caller.report(streamed).items()
+        )
+        latency_lines.append(f"{label}: {percentiles}")
+    embed.add_field(
+        name="AI Latency",
+        value="\n".join(latency_lines) + f"\n{ai_caller.timeouts} timeouts, {ai_caller.retries} retries, "
+              f"{ai_caller.hedges} hedges ({ai_caller.hedge_wins} won)",
+        inline=False
+    )
+    embed.add_field(
+        name="Spam Tracker",
+        value=f"{len(helper_moderation.spam_window)} users ({helper_moderation.spam_window.evicted} evicted)",
+        inline=True
+    )
+    embed.add_field(
+        name="Moderation Actions",
+        value=f"{helper_moderation.action_dispatcher.pending} queued, "
+              f"{helper_moderation.action_dispatcher.dropped} dropped",
+        inline=True
+    )
     embed.add_field(name="Last Error", value=error_time, inline=False)
     embed.set_footer(text="T.A.R.S. Diagnostics")
     await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1383,11 +1642,7 @@ async def slash_config_view(interaction: discord.Interaction):
     if interaction.user.id != OWNER_ID:
         await interaction.response.send_message(tars_text("Owner only."), ephemeral=True)
         return
-    rows = []
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT key, value FROM config")
-        rows = await cur.fetchall()
-    text = "\n".join(f"{k}: {v}" for k, v in rows) or "No config set."
+    text = "\n".join(f"{k}: {json.dumps(v)}" for k, v in config_store.items()) or "No config set."
     await interaction.response.send_message(
         embed=tars_embed("Live Configuration", text),
         ephemeral=True
@@ -1411,11 +1666,38 @@ async def slash_ai_stats(interaction: discord.Interaction):
         "**Top Users:**"
     ]
     lines.extend(f"- {uid}: {count}" for uid, count in top_users)
+    lookups = response_cache.hits + response_cache.misses
+    hit_rate = f"{response_cache.hits / lookups:.0%}" if lookups else "n/a"
+    lines.extend([
+        "",
+        f"Response Cache: {len(response_cache)} entries, {response_cache.hits} hits, "
+        f"{response_cache.misses} misses ({hit_rate} hit rate)"
+    ])
     await interaction.response.send_message(
         embed=tars_embed("AI Usage Metrics", "\n".join(lines)),
         ephemeral=True
     )
 
 
+@tree.command(name="modstats", description="View moderation rule timings (moderator)")
+async def slash_modstats(interaction: discord.Interaction):
+    if not interaction.user.guild_permissions.ban_members:
+        await interaction.response.send_message(tars_text("Insufficient clearance."), ephemeral=True)
+        return
+    lines = [
+        f"`{name}`: {stats.evaluations} runs, {stats.hits} hits, "
+        f"{stats.mean_us:.1f} µs avg, {stats.total_ns / 1e6:.1f} ms total"
+        for name, stats in helper_moderation.rule_report()
+    ]
+    cache = helper_moderation.verdict_cache
+    lookups = cache.hits + cache.misses
+    if lookups:
+        lines.append(f"Verdict cache: {len(cache)} entries, {cache.hits / lookups:.0%} hit rate over {lookups} lookups")
+    await interaction.response.send_message(
+        embed=tars_embed("Moderation Rule Metrics", "\n".join(lines) or "No rules registered."),
+        ephemeral=True
+    )
+
+
 if __name__ == "__main__":
     bot.run(DISCORD_TOKEN)
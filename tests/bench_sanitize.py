@@ -0,0 +1,30 @@
+import timeit
+
+from helper_moderation import sanitize_discord_mentions
+from tests.sanitize_reference import old_sanitize_and_strip, old_sanitize_discord_mentions
+
+PAYLOADS = {
+    "mention-heavy 12 KB": ("<@123> @everyone <#456> <@&789> hello there " * 300)[:12000],
+    "quote-sized with mentions": "Quoting <@123456789012345678> in <#987654321098765432>: " + "words " * 60,
+    "plain 3.5 KB": "nothing to escape in this line at all. " * 90,
+    "AI reply with link": "Try https://example.com/docs or ask <@&42> for help. " * 4,
+}
+
+
+def bench(func, text: str, number: int) -> float:
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'payload':30} {'old (us)':>10} {'new (us)':>10} {'old+links':>10} {'new+links':>10}")
+    for name, text in PAYLOADS.items():
+        number = 200 if len(text) > 5000 else 2000
+        print(f"{name:30} "
+              f"{bench(old_sanitize_discord_mentions, text, number):10.1f} "
+              f"{bench(sanitize_discord_mentions, text, number):10.1f} "
+              f"{bench(old_sanitize_and_strip, text, number):10.1f} "
+              f"{bench(lambda t: sanitize_discord_mentions(t, strip_links=True), text, number):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import re
+
+ZERO_WIDTH_SPACE = "\u200b"
+
+
+# The five-pass sanitizer and the separate link stripper that the single-pass
+# sanitize_discord_mentions replaced; kept as the behaviour it must match.
+def old_sanitize_discord_mentions(text: str) -> str:
+    text = text.replace("@everyone", f"@{ZERO_WIDTH_SPACE}everyone")
+    text = text.replace("@here", f"@{ZERO_WIDTH_SPACE}here")
+    text = re.sub(r"<@!?(\d+)>", f"<@{ZERO_WIDTH_SPACE}\\1>", text)
+    text = re.sub(r"<#(\d+)>", f"<#{ZERO_WIDTH_SPACE}\\1>", text)
+    text = re.sub(r"<@&(\d+)>", f"<@&{ZERO_WIDTH_SPACE}\\1>", text)
+    return text
+
+
+def old_strip_links(text: str) -> str:
+    return re.sub(r'https?://\S+', '[LINK REMOVED]', text)
+
+
+def old_sanitize_and_strip(text: str) -> str:
+    return old_strip_links(old_sanitize_discord_mentions(text))
@@ -0,0 +1,24 @@
+import asyncio
+
+from helper_ai import ResilientCaller
+
+
+def test_streamed_calls_do_not_set_hedge_threshold():
+    caller = ResilientCaller(deadline=5)
+
+    async def fast():
+        return "ok"
+
+    async def slow_stream():
+        await asyncio.sleep(0.05)
+        return 0
+
+    async def scenario():
+        for _ in range(5):
+            await caller.call(fast)
+            await caller.call(slow_stream, streamed=True)
+
+    asyncio.run(scenario())
+    assert len(caller.latency) == 5
+    assert len(caller.stream_latency) == 5
+    assert caller.report()["p99"] < 0.05 <= caller.report(streamed=True)["p50"]
@@ -0,0 +1,29 @@
+import asyncio
+
+import helper_db
+from helper_breakers import CircuitBreaker
+
+
+def test_failed_audit_batches_are_retried(monkeypatch):
+    monkeypatch.setattr(helper_db, "AUDIT_RETRY_BASE", 0.01)
+
+    async def scenario():
+        db = helper_db.Database(":memory:", breaker=CircuitBreaker("test", threshold=1000))
+        writer = helper_db.AuditWriter(db, flush_ms=10)
+        # The table doesn't exist yet, so the first writes fail like a locked database would.
+        for i in range(3):
+            await writer.add("boost_log", ("1", "boost_reward", i, "", 0))
+        await asyncio.sleep(0.1)
+        assert writer.failed and not writer.written
+        await db.execute(
+            "CREATE TABLE boost_log (user_id TEXT, action TEXT, points INTEGER, time TEXT, time_epoch INTEGER)"
+        )
+        await asyncio.wait_for(writer._queue.join(), 5)
+        rows = await db.fetchall("SELECT points FROM boost_log ORDER BY points")
+        await writer.close()
+        await db.close()
+        return rows, writer.dropped
+
+    rows, dropped = asyncio.run(scenario())
+    assert rows == [(0,), (1,), (2,)]
+    assert dropped == 0
@@ -0,0 +1,45 @@
+import httpx
+import openai
+
+from helper_ai import AIDeadlineExceeded, openai_breaker
+from helper_breakers import CLOSED, OPEN, UPTIME_BREAKER_THRESHOLD, CircuitBreaker, uptime_breaker, uptime_breakers
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _status_error(cls, code: int):
+    return cls("error", response=httpx.Response(code, request=REQUEST), body=None)
+
+
+def _fresh_openai_breaker() -> CircuitBreaker:
+    return CircuitBreaker("OpenAI", threshold=3, failure_types=openai_breaker.failure_types)
+
+
+def test_client_errors_do_not_open_openai_breaker():
+    breaker = _fresh_openai_breaker()
+    for _ in range(10):
+        breaker.record_failure(_status_error(openai.BadRequestError, 400))
+        breaker.record_failure(_status_error(openai.AuthenticationError, 401))
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_outages_open_openai_breaker():
+    breaker = _fresh_openai_breaker()
+    breaker.record_failure(openai.APIConnectionError(request=REQUEST))
+    breaker.record_failure(_status_error(openai.InternalServerError, 500))
+    breaker.record_failure(AIDeadlineExceeded("no response"))
+    assert breaker.state == OPEN
+
+
+def test_uptime_targets_trip_independently():
+    down = uptime_breaker("https://down.example")
+    up = uptime_breaker("https://up.example")
+    try:
+        for _ in range(UPTIME_BREAKER_THRESHOLD):
+            down.record_failure(OSError("unreachable"))
+        assert down.state == OPEN
+        assert up.allow() and up.state == CLOSED
+        assert uptime_breaker("https://down.example") is down
+    finally:
+        uptime_breakers.clear()
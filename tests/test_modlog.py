@@ -0,0 +1,48 @@
+import asyncio
+
+import discord
+
+from helper_modlog import ModLogSink
+
+
+class FakeResponse:
+    status = 503
+    reason = "Service Unavailable"
+
+
+class FakeChannel:
+    name = "tars-logs"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.sent = []
+
+    async def send(self, content=None, embeds=None):
+        if self.failures:
+            self.failures -= 1
+            raise discord.DiscordServerError(FakeResponse(), "unavailable")
+        self.sent.append(content if embeds is None else [e.description for e in embeds])
+
+
+class FakeGuild:
+    id = 9
+
+    def __init__(self, channel: FakeChannel):
+        self.text_channels = [channel]
+
+
+def test_failed_flush_is_retried_not_lost():
+    channel = FakeChannel(failures=2)
+    guild = FakeGuild(channel)
+    sink = ModLogSink(interval=0.01)
+
+    async def scenario():
+        await sink.send(guild, "first")
+        await sink.send(guild, "second")
+        await asyncio.sleep(0.3)
+        await sink.close()
+
+    asyncio.run(scenario())
+    assert sink.failed_flushes == 2
+    assert len(channel.sent) == 1
+    assert "first" in channel.sent[0][0] and "second" in channel.sent[0][0]
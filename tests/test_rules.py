@@ -0,0 +1,168 @@
+import asyncio
+
+import helper_moderation as hm
+from config import MODERATION_PROFILES, DEFAULT_ALLOWED_DOMAINS
+from helper_filters import ModerationMatcher
+from helper_profiles import ModerationProfile
+from helper_rules import ModerationContext, RuleEngine, VerdictCache
+
+
+class FakeChannel:
+    id = 55
+    mention = "#general"
+
+
+class FakeGuild:
+    id = 9
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeAuthor:
+    bot = False
+    roles = []
+
+    def __init__(self, uid: int):
+        self.id = uid
+
+    def __str__(self):
+        return f"user{self.id}"
+
+
+class FakeMessage:
+    def __init__(self, text: str, uid: int):
+        self.content = text
+        self.author = FakeAuthor(uid)
+        self.guild = FakeGuild()
+        self.channel = FakeChannel()
+
+
+def _evaluate(text: str, uid: int):
+    profile = ModerationProfile("default", MODERATION_PROFILES["default"])
+    profile.matcher = ModerationMatcher(["badword"])
+    profile.engine = RuleEngine(hm.RULES, cache=VerdictCache(), name="test")
+    return profile.engine.evaluate(ModerationContext(FakeMessage(text, uid), profile.matcher, profile))
+
+
+def test_banned_word_in_text_wall_is_deleted():
+    verdict = _evaluate("badword " * 80, uid=1001)
+    assert verdict.rule == "banned_words"
+    assert verdict.delete
+
+
+def test_repeated_banned_word_is_deleted():
+    for _ in range(3):
+        verdict = _evaluate("badword", uid=1002)
+    assert verdict.rule == "banned_words"
+    assert verdict.delete
+
+
+def test_banned_word_with_links_is_deleted():
+    verdict = _evaluate("badword https://a.example https://b.example https://c.example", uid=1003)
+    assert verdict.rule == "banned_words"
+    assert verdict.delete
+
+
+def test_blocked_domain_in_text_wall_is_deleted():
+    hm.domain_reputation.rebuild(DEFAULT_ALLOWED_DOMAINS, ["scam.gift"])
+    try:
+        verdict = _evaluate("free nitro https://claim.scam.gift/x " + "x" * 600, uid=1004)
+    finally:
+        hm.domain_reputation.rebuild(DEFAULT_ALLOWED_DOMAINS, [])
+    assert verdict.rule == "blocked_domains"
+    assert verdict.delete
+
+
+def test_warning_rules_still_fire_alone():
+    verdict = _evaluate("x" * 600, uid=1005)
+    assert verdict.rule == "text_wall"
+    assert not verdict.delete
+
+
+def _evaluate_edit(before: str, after: str, uid: int):
+    profile = ModerationProfile("default", MODERATION_PROFILES["default"])
+    profile.matcher = ModerationMatcher(["badword"])
+    profile.engine = RuleEngine(hm.RULES, cache=VerdictCache(), name="test")
+    return profile.engine.evaluate_edit(
+        ModerationContext(FakeMessage(before, uid), profile.matcher, profile),
+        ModerationContext(FakeMessage(after, uid), profile.matcher, profile),
+    )
+
+
+def test_edit_breaking_the_same_rule_is_not_warned_again():
+    assert _evaluate_edit("x" * 600, "y" * 600, uid=1006) is None
+    links = "https://a.example https://b.example https://c.example"
+    assert _evaluate_edit(links, links + " typo fixed", uid=1007) is None
+
+
+def test_edit_breaking_a_new_rule_is_warned():
+    verdict = _evaluate_edit("x" * 600, "badword " + "x" * 600, uid=1008)
+    assert verdict.rule == "banned_words"
+    verdict = _evaluate_edit("hello", "x" * 600, uid=1009)
+    assert verdict.rule == "text_wall"
+
+
+def test_server_wide_duplicates_alert_staff_without_warning(monkeypatch):
+    logged = []
+
+    async def fake_mod_log(guild, message, ping_staff=False):
+        logged.append(message)
+
+    monkeypatch.setattr(hm, "send_mod_log", fake_mod_log)
+    monkeypatch.setattr(hm, "flood_detector", hm.FloodDetector())
+
+    async def scenario():
+        verdicts = [_evaluate("happy birthday to you my friend!!", uid=2000 + i) for i in range(12)]
+        await hm.action_dispatcher.close()
+        return verdicts
+
+    assert asyncio.run(scenario()) == [None] * 12
+    # One alert when the channel threshold is first crossed, not one per message.
+    assert len(logged) == 1
+    assert "Near-duplicate flood (channel" in logged[0]
+
+
+def test_user_flood_is_still_deleted(monkeypatch):
+    monkeypatch.setattr(hm, "flood_detector", hm.FloodDetector())
+    texts = ["buy cheap followers now at my shop", "buy cheap followers now at my shop!",
+             "buy cheap followers now at my shop!!"]
+    verdicts = [_evaluate(text, uid=3000) for text in texts]
+    assert verdicts[-1].rule == "floods"
+    assert verdicts[-1].delete
+
+
+def test_edit_into_already_judged_text_uses_cached_rule():
+    profile = ModerationProfile("default", MODERATION_PROFILES["default"])
+    profile.matcher = ModerationMatcher(["badword"])
+    profile.engine = RuleEngine(hm.RULES, cache=VerdictCache(), name="test")
+    bad = "this has badword in it"
+    assert profile.engine.evaluate(ModerationContext(FakeMessage(bad, 1010), profile.matcher, profile)).delete
+    verdict = profile.engine.evaluate_edit(
+        ModerationContext(FakeMessage("harmless", 1011), profile.matcher, profile),
+        ModerationContext(FakeMessage(bad, 1011), profile.matcher, profile),
+    )
+    assert verdict.rule == "banned_words"
+    assert verdict.delete
+
+
+def test_domain_flood_alerts_staff_without_warning(monkeypatch):
+    logged = []
+
+    async def fake_mod_log(guild, message, ping_staff=False):
+        logged.append(message)
+
+    monkeypatch.setattr(hm, "send_mod_log", fake_mod_log)
+    monkeypatch.setattr(hm, "domain_flood_detector", hm.DomainFloodDetector())
+
+    async def scenario():
+        threshold = hm.domain_flood_detector.threshold
+        verdicts = [_evaluate(f"look at this https://reddit.example/r/{i}", uid=4000 + i)
+                    for i in range(threshold + 4)]
+        await hm.action_dispatcher.close()
+        return verdicts
+
+    assert all(verdict is None for verdict in asyncio.run(scenario()))
+    alerts = [entry for entry in logged if entry.startswith("Domain flood")]
+    assert len(alerts) == 1
+    assert "reddit.example" in alerts[0]
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from helper_moderation import sanitize_discord_mentions
+from tests.sanitize_reference import old_sanitize_and_strip, old_sanitize_discord_mentions
+
+FRAGMENTS = [
+    "@everyone", "@here", "@", "@every", "<@123>", "<@!456>", "<@&789>", "<#1011>", "<@>", "<#>", "<@&>",
+    "<@!>", "<", ">", "!", "&", "#", "1", "42", "http://", "https://", "https://a.b/c", "http://x.y",
+    "htt", "://", " ", "\n", "\t", "hello", "é", "\u200b", "<@12", "3>", "@@here", "<<@1>>",
+]
+
+TABLE = [
+    ("", ""),
+    ("plain text", "plain text"),
+    ("@everyone look", "@\u200beveryone look"),
+    ("hi <@123> and <@!456>", "hi <@\u200b123> and <@\u200b456>"),
+    ("role <@&789> chan <#1011>", "role <@&\u200b789> chan <#\u200b1011>"),
+    ("<@>", "<@>"),
+    ("email me@here.com", "email me@\u200bhere.com"),
+]
+
+
+@pytest.mark.parametrize("text, expected", TABLE)
+def test_table(text, expected):
+    assert sanitize_discord_mentions(text) == expected
+    assert sanitize_discord_mentions(text) == old_sanitize_discord_mentions(text)
+
+
+def test_strip_links_table():
+    text = "see https://evil.com/<@1> and @here http://x"
+    assert sanitize_discord_mentions(text, strip_links=True) == old_sanitize_and_strip(text)
+    assert "[LINK REMOVED]" in sanitize_discord_mentions(text, strip_links=True)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fuzz_matches_old_implementation(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 12)))
+        assert sanitize_discord_mentions(text) == old_sanitize_discord_mentions(text), repr(text)
+        assert sanitize_discord_mentions(text, strip_links=True) == old_sanitize_and_strip(text), repr(text)